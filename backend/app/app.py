@@ -1,88 +1,197 @@
-from flask import Flask
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
 from custom_type import *
 import json
+import logging
+import time
+import metrics
+from metrics import span
 from request_parser import parse_request
-from query import ask_question, generate_answer, generate_answer_with_context, get_starter_questions
-import re
+from faq_store import etag_matches
+from services import build_recommendations, build_faqs, chat_filters
+from query import ask_question, generate_answer, generate_answer_with_context, stream_answer_with_context, ollama_embed, answer_cache, answer_cache_key, busy_fallback, SERVICE_ERROR_ANSWER, BUSY_ANSWER
+from scheduler import GenerationBusy
+from starter_questions import starter_questions, start_warmup
+from multilingual import generation_language, needs_translation, reply, speech
+import readiness
+from config import ANSWER_CACHE_ENABLED, LOG_LEVEL, METRICS_ENABLED, SERVER_TIMING_ENABLED
+
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config['WTF_CSRF_ENABLED'] = False
-CORS(app)
+CORS(app, expose_headers=["ETag", "Server-Timing"])
+
+@app.before_request
+def before_request():
+    # Started from the first request (usually a /readyz probe) so only serving
+    # processes, not the debug reloader, warm up.
+    readiness.start()
+    start_warmup()
+    g.request_start = time.perf_counter()
+    g.timings = metrics.start_request()
+
+@app.after_request
+def after_request(response):
+    start = g.get("request_start")
+    if start is None:
+        return response
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    if SERVER_TIMING_ENABLED:
+        response.headers["Server-Timing"] = metrics.server_timing(g.timings, time.perf_counter() - start)
+        response.headers["Timing-Allow-Origin"] = "*"
+    # Recorded when the body is finished, so streamed responses count their full duration.
+    response.call_on_close(lambda: metrics.finish_request(endpoint, response.status_code, time.perf_counter() - start))
+    return response
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify(readiness.health())
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    ready, body = readiness.readiness()
+    return jsonify(body), 200 if ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    if not METRICS_ENABLED:
+        return {"error": "Metrics are disabled."}, 404
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
 
 @app.route('/chat', methods=['POST'])
 @parse_request(ChatRequest)
 def chat(data: ChatRequest):
     question = data.question
+    # Answers are generated (and cached) in the canonical language, then translated.
+    language = generation_language(data.language_preferance)
+
+    # Reuse a recent answer to a near-identical question from the same kind of user.
+    embedding = ollama_embed(question)
+    cache_key = answer_cache_key(data.status, language, data.country, data.state)
+    answer = answer_cache.lookup(embedding, cache_key) if ANSWER_CACHE_ENABLED else None
+    if answer is None:
+        context = ask_question(question, embedding=embedding)
+        try:
+            answer = generate_answer_with_context(question, context, language, chat_filters(data))
+        except GenerationBusy as e:
+            # Overloaded: answer from a similar cached question, or ask the client to retry.
+            logger.info("Chat generation busy: %s", e)
+            answer = busy_fallback(embedding, cache_key) if ANSWER_CACHE_ENABLED else None
+            if answer is None:
+                return jsonify(ChatResponse(BUSY_ANSWER).to_dict()), 503, {"Retry-After": "5"}
+            return jsonify(ChatResponse(*reply(answer, data.language_preferance)).to_dict())
+        if ANSWER_CACHE_ENABLED and answer != SERVICE_ERROR_ANSWER:
+            answer_cache.store(embedding, cache_key, answer)
+    localized, answer_id = reply(answer, data.language_preferance)
+    with span("serialize"):
+        return jsonify(ChatResponse(localized, answer_id).to_dict())
 
-    context = ask_question(question)
-    answer = generate_answer_with_context(question, context, data.language_preferance, {"status": data.status, "interests": data.interests, "country": data.country, "state": data.state})
-    chat_response = ChatResponse(answer)
-    return chat_response.to_dict()
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def sse_answer(answer, language):
+    localized, answer_id = reply(answer, language)
+    yield sse_event("token", {"token": localized})
+    yield sse_event("done", {"answer": localized, "answer_id": answer_id})
+
+@app.route('/chat/stream', methods=['POST'])
+@parse_request(ChatRequest)
+def chat_stream(data: ChatRequest):
+    """
+    Streaming variant of /chat. Emits Server-Sent Events: one `token` event per
+    generated token, then a `done` event carrying the full answer (or an `error`
+    event). If the client disconnects, the generator is closed and the upstream
+    Ollama request is dropped so generation stops. Answers that need translating
+    arrive as a single token once the canonical answer is complete.
+    """
+    question = data.question
+    language = generation_language(data.language_preferance)
+    translated = needs_translation(data.language_preferance)
+    cache_key = answer_cache_key(data.status, language, data.country, data.state)
+
+    def generate():
+        tokens = None
+        parts = []
+        try:
+            # Embedding and retrieval run inside the try too, so every failure ends in an `error` event.
+            embedding = ollama_embed(question)
+            cached = answer_cache.lookup(embedding, cache_key) if ANSWER_CACHE_ENABLED else None
+            if cached is not None:
+                yield from sse_answer(cached, data.language_preferance)
+                return
+
+            context = ask_question(question, embedding=embedding)
+            tokens = stream_answer_with_context(question, context, language, chat_filters(data))
+            for token in tokens:
+                parts.append(token)
+                if not translated:
+                    yield sse_event("token", {"token": token})
+        except GenerationBusy as e:
+            logger.info("Chat generation busy: %s", e)
+            fallback = busy_fallback(embedding, cache_key) if ANSWER_CACHE_ENABLED else None
+            if fallback is None:
+                yield sse_event("error", {"error": BUSY_ANSWER})
+            else:
+                yield from sse_answer(fallback, data.language_preferance)
+            return
+        except Exception as e:
+            logger.warning("Chat stream failed: %s", e)
+            yield sse_event("error", {"error": SERVICE_ERROR_ANSWER})
+            return
+        finally:
+            if tokens is not None:
+                tokens.close()
+
+        answer = "".join(parts)
+        if ANSWER_CACHE_ENABLED and answer:
+            answer_cache.store(embedding, cache_key, answer)
+        localized, answer_id = reply(answer, data.language_preferance)
+        if translated:
+            yield sse_event("token", {"token": localized})
+        yield sse_event("done", {"answer": localized, "answer_id": answer_id})
+
+    return Response(generate(), mimetype='text/event-stream', headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/chat/audio', methods=['POST'])
+@parse_request(AudioRequest)
+def chat_audio(data: AudioRequest):
+    """Spoken answer for an answer_id returned by /chat, streamed in chunks as it is synthesized."""
+    result = speech(data.answer_id, data.language_preferance, data.voice)
+    if result is None:
+        return {"error": "Unknown answer or speech is disabled."}, 404
+    media_type, chunks = result
+    return Response(chunks, mimetype=media_type, headers={"Cache-Control": "private, max-age=86400"})
 
 @app.route('/queries', methods=['POST'])
 @parse_request(PersonalizedQueryRequest)
 def queries(data: PersonalizedQueryRequest):
-    queries = get_starter_questions(data.status, data.country, data.state, data.language_preferance)
-    json_list = re.split(r'\||\n', queries)
-    return PersonalizedQueryResponse(json_list).to_dict()
+    json_list = starter_questions(data.status, data.country, data.state, data.language_preferance)
+    with span("serialize"):
+        return jsonify(PersonalizedQueryResponse(json_list).to_dict())
 
 @app.route('/recommendations', methods=['POST'])
 @parse_request(RecommendationRequest)
 def recommendations(data: RecommendationRequest):
-    print("Received data:", data)
-    with open('../data/events.json', 'r') as file:
-        events_data = json.load(file)
-        events = []
-        for event in events_data:
-            location = Location(
-                venue_name=event['location']['venue_name'],
-                address=event['location']['address'],
-                city=event['location']['city'],
-                state=event['location']['state'],
-                is_virtual=event['location']['is_virtual']
-            )
-            organizer = Organizer(
-                name=event['organizer']['name'],
-                type=event['organizer']['type'],
-                contact_email=event['organizer']['contact_email'],
-                website=event['organizer']['website']
-            )
-            event_obj = Event(
-                id=event['id'],
-                name=event['name'],
-                description=event['description'],
-                start_datetime=event['start_datetime'],
-                end_datetime=event['end_datetime'],
-                location=location,
-                category=event['category'],
-                subcategory=event['subcategory'],
-                tags=event['tags'],
-                organizer=organizer,
-                image_url=event['image_url']
-            )
-            events.append(event_obj)
-    recommendation_response = RecommendationResponse(events)
-    return recommendation_response.to_dict()
+    logger.debug("Recommendations request: %s", data)
+    recommendation_response = build_recommendations(data)
+    with span("serialize"):
+        return jsonify(recommendation_response.to_dict())
 
 @app.route('/faqs', methods=['POST'])
 @parse_request(FaqRequest)
 def faqs(data: FaqRequest):
-    print("Received data:", data)
-    status = data.status
-    faqResponse = FaqResponse([])
+    logger.debug("FAQs request: %s", data)
     try:
-        with open('../data/faqs.json', 'r') as file:
-            faqs_data = json.load(file)
-            for faq in faqs_data:
-                if (faq['visa_type'] == status):
-                    qaPair = QAPair(faq['question'], faq['answer'])
-                    faqResponse.faqs.append(qaPair)
-            
+        body, etag = build_faqs(data)
     except FileNotFoundError:
         return {"error": "FAQs data file not found."}, 500
-    
-    return faqResponse.to_dict()
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype='application/json', headers=headers)
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,241 @@
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import logging
+import time
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from custom_type import *
+from request_parser import parse_async_request
+from faq_store import etag_matches
+from services import build_recommendations, build_faqs, chat_filters
+from query import (
+    ask_question, agenerate_answer_with_context, astream_answer_with_context,
+    aollama_embed, answer_cache, answer_cache_key, busy_fallback, SERVICE_ERROR_ANSWER, BUSY_ANSWER
+)
+from scheduler import GenerationBusy
+from starter_questions import astarter_questions, start_warmup, stop_warmup
+from multilingual import generation_language, needs_translation, reply, speech
+from config import ANSWER_CACHE_ENABLED, LOG_LEVEL, METRICS_ENABLED, SERVER_TIMING_ENABLED
+import ollama_client
+import readiness
+import metrics
+from metrics import span
+
+# Async serving path with the same contracts as app.py. Upstream Ollama calls are
+# awaited on one shared keep-alive httpx client, so a single process can hold
+# many concurrent chats while they wait on the model. Blocking work (Chroma
+# queries, file reads) runs in the thread pool.
+#
+# Run with: uvicorn asgi:app --port 5000
+
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+
+@parse_async_request(ChatRequest)
+async def chat(data: ChatRequest):
+    question = data.question
+    # Answers are generated (and cached) in the canonical language, then translated.
+    language = generation_language(data.language_preferance)
+
+    # Reuse a recent answer to a near-identical question from the same kind of user.
+    embedding = await aollama_embed(question)
+    cache_key = answer_cache_key(data.status, language, data.country, data.state)
+    answer = answer_cache.lookup(embedding, cache_key) if ANSWER_CACHE_ENABLED else None
+    if answer is None:
+        context = await asyncio.to_thread(ask_question, question, 3, embedding)
+        try:
+            answer = await agenerate_answer_with_context(question, context, language, chat_filters(data))
+        except GenerationBusy as e:
+            logger.info("Chat generation busy: %s", e)
+            answer = busy_fallback(embedding, cache_key) if ANSWER_CACHE_ENABLED else None
+            if answer is None:
+                return JSONResponse(ChatResponse(BUSY_ANSWER).to_dict(), status_code=503, headers={"Retry-After": "5"})
+            return JSONResponse(ChatResponse(*await asyncio.to_thread(reply, answer, data.language_preferance)).to_dict())
+        if ANSWER_CACHE_ENABLED and answer != SERVICE_ERROR_ANSWER:
+            answer_cache.store(embedding, cache_key, answer)
+    # Translation and the answer store are blocking calls.
+    localized, answer_id = await asyncio.to_thread(reply, answer, data.language_preferance)
+    with span("serialize"):
+        return JSONResponse(ChatResponse(localized, answer_id).to_dict())
+
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+async def sse_answer(answer, language):
+    localized, answer_id = await asyncio.to_thread(reply, answer, language)
+    return [sse_event("token", {"token": localized}), sse_event("done", {"answer": localized, "answer_id": answer_id})]
+
+@parse_async_request(ChatRequest)
+async def chat_stream(data: ChatRequest):
+    """
+    Streaming variant of /chat (see app.py). When the client disconnects the
+    response task is cancelled, which exits the upstream stream and stops Ollama.
+    """
+    question = data.question
+    language = generation_language(data.language_preferance)
+    translated = needs_translation(data.language_preferance)
+    cache_key = answer_cache_key(data.status, language, data.country, data.state)
+
+    async def generate():
+        tokens = None
+        parts = []
+        try:
+            embedding = await aollama_embed(question)
+            cached = answer_cache.lookup(embedding, cache_key) if ANSWER_CACHE_ENABLED else None
+            if cached is not None:
+                for event in await sse_answer(cached, data.language_preferance):
+                    yield event
+                return
+
+            context = await asyncio.to_thread(ask_question, question, 3, embedding)
+            tokens = astream_answer_with_context(question, context, language, chat_filters(data))
+            async for token in tokens:
+                parts.append(token)
+                if not translated:
+                    yield sse_event("token", {"token": token})
+        except GenerationBusy as e:
+            logger.info("Chat generation busy: %s", e)
+            fallback = busy_fallback(embedding, cache_key) if ANSWER_CACHE_ENABLED else None
+            if fallback is None:
+                yield sse_event("error", {"error": BUSY_ANSWER})
+            else:
+                for event in await sse_answer(fallback, data.language_preferance):
+                    yield event
+            return
+        except Exception as e:
+            logger.warning("Chat stream failed: %s", e)
+            yield sse_event("error", {"error": SERVICE_ERROR_ANSWER})
+            return
+        finally:
+            if tokens is not None:
+                await tokens.aclose()
+
+        answer = "".join(parts)
+        if ANSWER_CACHE_ENABLED and answer:
+            answer_cache.store(embedding, cache_key, answer)
+        localized, answer_id = await asyncio.to_thread(reply, answer, data.language_preferance)
+        if translated:
+            yield sse_event("token", {"token": localized})
+        yield sse_event("done", {"answer": localized, "answer_id": answer_id})
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@parse_async_request(AudioRequest)
+async def chat_audio(data: AudioRequest):
+    # A cache miss translates the answer before the first chunk; the synchronous
+    # chunk iterator itself is drained in the thread pool by StreamingResponse.
+    result = await asyncio.to_thread(speech, data.answer_id, data.language_preferance, data.voice)
+    if result is None:
+        return JSONResponse({"error": "Unknown answer or speech is disabled."}, status_code=404)
+    media_type, chunks = result
+    return StreamingResponse(chunks, media_type=media_type, headers={"Cache-Control": "private, max-age=86400"})
+
+@parse_async_request(PersonalizedQueryRequest)
+async def queries(data: PersonalizedQueryRequest):
+    json_list = await astarter_questions(data.status, data.country, data.state, data.language_preferance)
+    with span("serialize"):
+        return JSONResponse(PersonalizedQueryResponse(json_list).to_dict())
+
+@parse_async_request(RecommendationRequest)
+async def recommendations(data: RecommendationRequest):
+    logger.debug("Recommendations request: %s", data)
+    recommendation_response = await asyncio.to_thread(build_recommendations, data)
+    with span("serialize"):
+        return JSONResponse(recommendation_response.to_dict())
+
+@parse_async_request(FaqRequest)
+async def faqs(data: FaqRequest, request=None):
+    logger.debug("FAQs request: %s", data)
+    try:
+        body, etag = build_faqs(data)
+    except FileNotFoundError:
+        return JSONResponse({"error": "FAQs data file not found."}, status_code=500)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+async def healthz(request):
+    # The health report probes Ollama with a blocking request.
+    return JSONResponse(await asyncio.to_thread(readiness.health))
+
+async def readyz(request):
+    ready, body = readiness.readiness()
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+async def prometheus_metrics(request):
+    if not METRICS_ENABLED:
+        return JSONResponse({"error": "Metrics are disabled."}, status_code=404)
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+class MetricsMiddleware:
+    """
+    Times every request, records it per route on /metrics and, when
+    SERVER_TIMING_ENABLED is set, adds a Server-Timing header with the spans
+    recorded before the response started.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        timings = metrics.start_request()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    value = metrics.server_timing(timings, time.perf_counter() - start)
+                    headers = [*message.get("headers", []), (b"server-timing", value.encode()), (b"timing-allow-origin", b"*")]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            endpoint = scope["path"] if scope["path"] in ROUTE_PATHS else "unmatched"
+            metrics.finish_request(endpoint, status, time.perf_counter() - start)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm-up runs in the background; /readyz reports when it is done.
+    readiness.start()
+    start_warmup()
+    yield
+    stop_warmup()
+    await ollama_client.aclose()
+
+
+app = Starlette(
+    routes=[
+        Route('/chat', chat, methods=['POST']),
+        Route('/chat/stream', chat_stream, methods=['POST']),
+        Route('/chat/audio', chat_audio, methods=['POST']),
+        Route('/queries', queries, methods=['POST']),
+        Route('/recommendations', recommendations, methods=['POST']),
+        Route('/faqs', faqs, methods=['POST']),
+        Route('/healthz', healthz, methods=['GET']),
+        Route('/readyz', readyz, methods=['GET']),
+        Route('/metrics', prometheus_metrics, methods=['GET']),
+    ],
+    middleware=[
+        Middleware(MetricsMiddleware),
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"], expose_headers=["ETag", "Server-Timing"]),
+    ],
+    lifespan=lifespan,
+)
+ROUTE_PATHS = {route.path for route in app.routes}
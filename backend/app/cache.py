@@ -0,0 +1,203 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+import logging
+import sqlite3
+import threading
+import pickle
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache with an optional time-to-live per entry.
+    Keeps hit/miss counters so callers can report cache effectiveness.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class DiskCache:
+    """
+    Small persistent key/value store on SQLite, used as a second tier behind
+    TTLCache so cached values survive restarts. Values are pickled.
+    """
+
+    def __init__(self, path, max_entries=100_000, ttl=None):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, created_at REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and (self.ttl is None or row[1] + self.ttl > time.time()):
+                self.hits += 1
+                return pickle.loads(row[0])
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, pickle.dumps(value), time.time())
+            )
+            self._writes += 1
+            # Trim occasionally rather than on every write.
+            if self._writes % 100 == 0:
+                self._trim()
+            self._conn.commit()
+
+    def _trim(self):
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM cache WHERE created_at < ?", (time.time() - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {"size": size, "maxsize": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+class StaleWhileRevalidateCache:
+    """
+    Cache for values that are expensive to compute but fine to serve slightly
+    out of date. Entries are fresh for `ttl` seconds and may then be served for
+    another `stale_ttl` seconds while a single background refresh recomputes
+    them. Concurrent misses for the same key share one load.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600, stale_ttl=86400, max_workers=2):
+        self.ttl = ttl
+        self._entries = TTLCache(maxsize, ttl + stale_ttl)
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="swr-refresh")
+        self.stale_hits = 0
+        self.refreshes = 0
+
+    def get(self, key):
+        """Returns (value, fresh); value is None when nothing usable is cached."""
+        item = self._entries.get(key)
+        if item is None:
+            return None, False
+        value, fresh_until = item
+        return value, fresh_until > time.monotonic()
+
+    def set(self, key, value):
+        self._entries.set(key, (value, time.monotonic() + self.ttl))
+
+    def _load(self, key, loader):
+        """Runs loader for key unless a load is already in flight; returns its Future."""
+        with self._lock:
+            future = self._loading.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._loading[key] = future
+        try:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+            future.set_result(value)
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+        return future, True
+
+    def refresh(self, key, loader):
+        """Recomputes key in the background; no-op if a load is already running."""
+        with self._lock:
+            if key in self._loading:
+                return
+        self.refreshes += 1
+        self._executor.submit(self._refresh, key, loader)
+
+    def _refresh(self, key, loader):
+        future, owner = self._load(key, loader)
+        if owner and future.exception() is not None:
+            logger.warning("Background refresh of %r failed: %s", key, future.exception())
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the cached value, refreshing it in the background when stale.
+        On a miss the value is computed with loader() (or awaited from a load
+        already running for the same key). A loader returning None is not cached.
+        """
+        value, fresh = self.get(key)
+        if value is not None:
+            if not fresh:
+                self.stale_hits += 1
+                self.refresh(key, loader)
+            return value
+        future, _ = self._load(key, loader)
+        return future.result()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        stats = self._entries.stats()
+        stats.update(stale_hits=self.stale_hits, refreshes=self.refreshes, loading=len(self._loading))
+        return stats
@@ -0,0 +1,194 @@
+from dataclasses import dataclass
+from pathlib import Path
+import re
+import sqlite3
+import threading
+
+# Chunking strategies for ingest. Every strategy takes the text of a document
+# page by page and returns Chunk objects that remember which pages they came
+# from. Sizes are in words (a stable proxy for tokens that needs no tokenizer).
+#
+#   fixed     sliding window of `size` words with `overlap` words of overlap
+#   sentence  packs whole sentences up to `size` words, preferring to cut at
+#             paragraph ends; `overlap` words of trailing sentences are repeated
+#   page      like "sentence", but a chunk never crosses a page boundary
+#
+# With a parent size set, chunk_document does small-to-big chunking: the
+# strategy cuts large parent passages, each parent is split into small child
+# chunks, and only the children are embedded and indexed. Retrieval matches on
+# the precise child and hands the LLM its parent passage (see ParentStore).
+
+SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+@dataclass
+class Chunk:
+    text: str
+    page_start: int
+    page_end: int
+    parent: int = None
+
+
+def clean_text(text):
+    return re.sub(r"\s+", " ", text).strip()
+
+def split_sentences(text, min_chars=25):
+    """Splits text into sentences, gluing fragments shorter than min_chars onto the next one."""
+    sentences = []
+    pending = ""
+    for part in SENTENCE_END.split(text.strip()):
+        pending = f"{pending} {part}".strip() if pending else part.strip()
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        if sentences:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+    return sentences
+
+def sentence_units(pages, size):
+    """
+    (sentence, page, ends_paragraph, words) for every sentence, pages numbered
+    from 1. Sentences longer than `size` words are cut into size-word pieces.
+    """
+    units = []
+    for number, page in enumerate(pages, 1):
+        for paragraph in PARAGRAPH_BREAK.split(page):
+            sentences = split_sentences(clean_text(paragraph))
+            for i, sentence in enumerate(sentences):
+                words = sentence.split()
+                pieces = [words[j:j + size] for j in range(0, len(words), size)]
+                for k, piece in enumerate(pieces):
+                    ends = i == len(sentences) - 1 and k == len(pieces) - 1
+                    units.append((" ".join(piece), number, ends, len(piece)))
+    return units
+
+def pack(units, size, overlap):
+    chunks = []
+    current, words = [], 0
+
+    def flush():
+        chunks.append(Chunk(" ".join(u[0] for u in current), current[0][1], current[-1][1]))
+
+    for unit in units:
+        if current and words + unit[3] > size:
+            flush()
+            # Repeat trailing sentences (up to `overlap` words) at the start of the next chunk.
+            carry, carried = [], 0
+            for previous in reversed(current):
+                if carried + previous[3] > overlap or len(carry) + 1 == len(current):
+                    break
+                carry.insert(0, previous)
+                carried += previous[3]
+            current, words = carry, carried
+        current.append(unit)
+        words += unit[3]
+        if unit[2] and words >= size // 2:
+            # A paragraph end past the halfway mark is a natural place to cut.
+            flush()
+            current, words = [], 0
+    if current:
+        flush()
+    return chunks
+
+
+# 1. Strategies
+def fixed_chunks(pages, size, overlap=0):
+    words = [(word, number) for number, page in enumerate(pages, 1) for word in page.split()]
+    step = max(1, size - overlap)
+    chunks = []
+    for start in range(0, len(words), step):
+        window = words[start:start + size]
+        chunks.append(Chunk(" ".join(w for w, _ in window), window[0][1], window[-1][1]))
+        if start + size >= len(words):
+            break
+    return chunks
+
+def sentence_chunks(pages, size, overlap=0):
+    return pack(sentence_units(pages, size), size, overlap)
+
+def page_chunks(pages, size, overlap=0):
+    chunks = []
+    for number, page in enumerate(pages, 1):
+        for chunk in sentence_chunks([page], size, overlap):
+            chunks.append(Chunk(chunk.text, number, number))
+    return chunks
+
+STRATEGIES = {"fixed": fixed_chunks, "sentence": sentence_chunks, "page": page_chunks}
+
+
+def chunk_document(pages, strategy="sentence", size=120, overlap=20, parent_size=0):
+    """
+    Returns (chunks, parents). Without a parent size, parents is empty and the
+    chunks come straight from the strategy. Otherwise the strategy cuts parent
+    passages of parent_size words and each chunk points at its parent by index.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy {strategy!r}; expected one of {sorted(STRATEGIES)}")
+    split = STRATEGIES[strategy]
+    if not parent_size or parent_size <= size:
+        return [c for c in split(pages, size, overlap) if c.text], []
+
+    parents = [p for p in split(pages, parent_size, 0) if p.text]
+    chunks = []
+    for index, parent in enumerate(parents):
+        # Children inherit the parent's page range.
+        for child in sentence_chunks([parent.text], size, overlap):
+            if child.text:
+                chunks.append(Chunk(child.text, parent.page_start, parent.page_end, index))
+    return chunks, parents
+
+
+# 2. Parent passages for small-to-big retrieval
+class ParentStore:
+    """
+    Parent passages keyed by id, in a SQLite file next to the Chroma data.
+    ingest.py writes them; query.py swaps retrieved child chunks for them.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self, create=False):
+        if self._conn is None:
+            if not create and not self.path.exists():
+                return None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS parents (id TEXT PRIMARY KEY, text TEXT)")
+            self._conn.commit()
+        return self._conn
+
+    def put(self, ids, texts):
+        with self._lock:
+            conn = self._connection(create=True)
+            conn.executemany("INSERT OR REPLACE INTO parents (id, text) VALUES (?, ?)", list(zip(ids, texts)))
+            conn.commit()
+
+    def get(self, ids):
+        """Returns {id: text} for the ids that exist."""
+        if not ids:
+            return {}
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return {}
+            rows = conn.execute(
+                f"SELECT id, text FROM parents WHERE id IN ({','.join('?' * len(ids))})", list(ids)
+            ).fetchall()
+        return dict(rows)
+
+    def delete(self, ids):
+        if not ids:
+            return
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            conn.executemany("DELETE FROM parents WHERE id = ?", [(i,) for i in ids])
+            conn.commit()
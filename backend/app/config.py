@@ -0,0 +1,181 @@
+from pathlib import Path
+import os
+
+# Central place for tunables. Everything can be overridden through environment
+# variables so the same code runs locally, in benchmarks and in deployment.
+
+# Ollama
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+EMBED_MODEL = os.environ.get("EMBED_MODEL", "nomic-embed-text")
+
+# Embedding backend (see embedding_backend.py): "ollama" or "local" (in-process sentence-transformers).
+# Switching backends or models requires `python ingest.py --full`.
+EMBED_BACKEND = os.environ.get("EMBED_BACKEND", "ollama")
+EMBED_LOCAL_MODEL = os.environ.get("EMBED_LOCAL_MODEL", "nomic-ai/nomic-embed-text-v1.5")
+EMBED_LOCAL_DEVICE = os.environ.get("EMBED_LOCAL_DEVICE", "cpu")
+# Torch intra-op threads for the local model (0 = torch default).
+EMBED_LOCAL_THREADS = int(os.environ.get("EMBED_LOCAL_THREADS", "0"))
+EMBED_LOCAL_BATCH_SIZE = int(os.environ.get("EMBED_LOCAL_BATCH_SIZE", "32"))
+# int8 dynamic quantization of the torch model's linear layers.
+EMBED_LOCAL_QUANTIZE = os.environ.get("EMBED_LOCAL_QUANTIZE", "0") == "1"
+# Run the model with ONNX Runtime; EMBED_LOCAL_ONNX_FILE selects a specific (e.g. quantized) export.
+EMBED_LOCAL_ONNX = os.environ.get("EMBED_LOCAL_ONNX", "0") == "1"
+EMBED_LOCAL_ONNX_FILE = os.environ.get("EMBED_LOCAL_ONNX_FILE", "")
+CHAT_MODEL = os.environ.get("CHAT_MODEL", "mistral")
+
+# Observability
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+# Adds a Server-Timing header with per-stage durations to every response.
+SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING_ENABLED", "0") == "1"
+
+# Storage
+CHROMA_PATH = os.environ.get("CHROMA_PATH", str(Path(__file__).resolve().parent.parent / ".chromadb"))
+
+# Ingestion
+INGEST_EMBED_BATCH_SIZE = int(os.environ.get("INGEST_EMBED_BATCH_SIZE", "32"))
+INGEST_EMBED_CONCURRENCY = int(os.environ.get("INGEST_EMBED_CONCURRENCY", "4"))
+INGEST_ADD_BATCH_SIZE = int(os.environ.get("INGEST_ADD_BATCH_SIZE", "1000"))
+# Chunking (see chunking.py). Sizes are in words. With CHUNK_PARENT_SIZE > 0, small
+# chunks of INGEST_CHUNK_SIZE words are indexed and their parent passage is returned.
+CHUNK_STRATEGY = os.environ.get("CHUNK_STRATEGY", "sentence")
+INGEST_CHUNK_SIZE = int(os.environ.get("INGEST_CHUNK_SIZE", "120"))
+CHUNK_OVERLAP = int(os.environ.get("CHUNK_OVERLAP", "20"))
+CHUNK_PARENT_SIZE = int(os.environ.get("CHUNK_PARENT_SIZE", "400"))
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", str(os.cpu_count() or 1)))
+INGEST_QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", "4"))
+
+# Query embedding cache
+EMBED_CACHE_SIZE = int(os.environ.get("EMBED_CACHE_SIZE", "2048"))
+EMBED_CACHE_TTL = float(os.environ.get("EMBED_CACHE_TTL", "86400"))
+# Set to a file path (e.g. ../.cache/embeddings.sqlite) to keep embeddings across restarts.
+EMBED_CACHE_PATH = os.environ.get("EMBED_CACHE_PATH", "")
+
+# Semantic answer cache for /chat
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "2000"))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "3600"))
+
+# Shared upstream HTTP clients
+OLLAMA_POOL_SIZE = int(os.environ.get("OLLAMA_POOL_SIZE", "100"))
+OLLAMA_KEEPALIVE_CONNECTIONS = int(os.environ.get("OLLAMA_KEEPALIVE_CONNECTIONS", "20"))
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_READ_TIMEOUT = float(os.environ.get("OLLAMA_READ_TIMEOUT", "300"))
+# How long Ollama keeps a model loaded after each request ("30m", seconds, or -1 for
+# forever); empty uses Ollama's default of 5 minutes.
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "")
+
+# Startup warm-up and readiness (see readiness.py)
+# Opens the index, embeds and generates once and pre-fills caches in the background;
+# /readyz answers 503 until every check has passed.
+STARTUP_WARMUP_ENABLED = os.environ.get("STARTUP_WARMUP_ENABLED", "1") == "1"
+# Include a one-token chat so the generation model is loaded too.
+STARTUP_WARMUP_CHAT = os.environ.get("STARTUP_WARMUP_CHAT", "1") == "1"
+# Seconds between attempts while a dependency is still failing.
+STARTUP_WARMUP_RETRY = float(os.environ.get("STARTUP_WARMUP_RETRY", "5"))
+
+# LLM generation scheduling (see scheduler.py)
+# Chat generations are spread over these Ollama endpoints (comma-separated); embeddings use OLLAMA_URL.
+OLLAMA_CHAT_URLS = [url.strip().rstrip("/") for url in os.environ.get("OLLAMA_CHAT_URLS", OLLAMA_URL).split(",") if url.strip()]
+# Concurrent generations per model on each endpoint; match Ollama's OLLAMA_NUM_PARALLEL.
+GENERATION_CONCURRENCY = int(os.environ.get("GENERATION_CONCURRENCY", "2"))
+GENERATION_MAX_QUEUE = int(os.environ.get("GENERATION_MAX_QUEUE", "32"))
+# How long each request class may wait for a slot before it is answered as busy.
+GENERATION_MAX_WAIT_CHAT = float(os.environ.get("GENERATION_MAX_WAIT_CHAT", "20"))
+GENERATION_MAX_WAIT_QUERIES = float(os.environ.get("GENERATION_MAX_WAIT_QUERIES", "5"))
+GENERATION_MAX_WAIT_WARMUP = float(os.environ.get("GENERATION_MAX_WAIT_WARMUP", "120"))
+# Read timeout for a generation once it has started.
+GENERATION_TIMEOUT = float(os.environ.get("GENERATION_TIMEOUT", "120"))
+# When generation is busy, /chat serves a cached answer this similar instead, if there is one.
+ANSWER_CACHE_FALLBACK_THRESHOLD = float(os.environ.get("ANSWER_CACHE_FALLBACK_THRESHOLD", "0.85"))
+
+# Micro-batching of concurrent query embeddings
+EMBED_BATCHING_ENABLED = os.environ.get("EMBED_BATCHING_ENABLED", "1") == "1"
+EMBED_BATCH_MAX_SIZE = int(os.environ.get("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_WINDOW_MS = float(os.environ.get("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_BATCH_MAX_IN_FLIGHT = int(os.environ.get("EMBED_BATCH_MAX_IN_FLIGHT", "4"))
+
+# Hybrid (BM25 + vector) retrieval
+# "hybrid" fuses BM25 and vector rankings with reciprocal rank fusion; "vector" is dense only.
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid")
+LEXICAL_INDEX_PATH = os.environ.get("LEXICAL_INDEX_PATH", str(Path(__file__).resolve().parent.parent / ".bm25_index.json"))
+HYBRID_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.environ.get("RRF_K", "60"))
+
+# Vector search engine: "chroma" (HNSW) or "exact" (memory-mapped matrix exported by
+# ingest.py, see exact_index.py; does not need chromadb at query time).
+RETRIEVAL_ENGINE = os.environ.get("RETRIEVAL_ENGINE", "chroma")
+EXACT_INDEX_PATH = os.environ.get("EXACT_INDEX_PATH", str(Path(__file__).resolve().parent.parent / ".exact_index"))
+
+# Second-stage reranking (see reranker.py)
+RERANK_ENABLED = os.environ.get("RERANK_ENABLED", "1") == "1"
+# "lexical" (term overlap, no model) or "cross-encoder" (RERANK_MODEL via sentence-transformers).
+RERANKER = os.environ.get("RERANKER", "lexical")
+RERANK_MODEL = os.environ.get("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_DEVICE = os.environ.get("RERANK_DEVICE", "cpu")
+# First-stage hits rescored per question; only the best n_results are kept.
+RERANK_CANDIDATES = int(os.environ.get("RERANK_CANDIDATES", "30"))
+RERANK_BATCH_SIZE = int(os.environ.get("RERANK_BATCH_SIZE", "16"))
+# No new scoring batch starts after this many milliseconds.
+RERANK_BUDGET_MS = float(os.environ.get("RERANK_BUDGET_MS", "150"))
+RERANK_CACHE_SIZE = int(os.environ.get("RERANK_CACHE_SIZE", "20000"))
+RERANK_CACHE_TTL = float(os.environ.get("RERANK_CACHE_TTL", "86400"))
+
+# Answer prompt
+# Approximate token budget for the retrieved context sent to the LLM.
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "700"))
+# How sentences are ranked when the budget is exceeded: "embedding" (similarity to the
+# question) or "lexical" (term overlap, no extra embedding calls).
+CONTEXT_SCORER = os.environ.get("CONTEXT_SCORER", "embedding")
+ANSWER_TEMPERATURE = float(os.environ.get("ANSWER_TEMPERATURE", "0.2"))
+
+# Topic query routing
+ROUTING_ENABLED = os.environ.get("ROUTING_ENABLED", "1") == "1"
+ROUTER_CENTROIDS_PATH = os.environ.get("ROUTER_CENTROIDS_PATH", str(Path(__file__).resolve().parent.parent / ".topic_centroids.json"))
+# Topics whose centroid similarity is within this margin of the best are kept.
+ROUTER_CENTROID_MARGIN = float(os.environ.get("ROUTER_CENTROID_MARGIN", "0.02"))
+ROUTER_MAX_TOPICS = int(os.environ.get("ROUTER_MAX_TOPICS", "2"))
+# Broad topics that are always searched alongside the predicted ones.
+ROUTER_CATCHALL_TOPICS = os.environ.get("ROUTER_CATCHALL_TOPICS", "faq,general").split(",")
+
+# /recommendations
+RECOMMENDATIONS_MAX_PAGE_SIZE = int(os.environ.get("RECOMMENDATIONS_MAX_PAGE_SIZE", "100"))
+# "embedding" ranks events by similarity to the user's interests; "index" uses the keyword indexes only.
+RECOMMENDER_MODE = os.environ.get("RECOMMENDER_MODE", "embedding")
+RECOMMENDER_CACHE_PATH = os.environ.get("RECOMMENDER_CACHE_PATH", str(Path(__file__).resolve().parent.parent / ".cache" / "event_embeddings.npz"))
+RECOMMENDER_EMBED_BATCH_SIZE = int(os.environ.get("RECOMMENDER_EMBED_BATCH_SIZE", "64"))
+RECOMMENDER_RECENCY_WEIGHT = float(os.environ.get("RECOMMENDER_RECENCY_WEIGHT", "0.1"))
+RECOMMENDER_RECENCY_DAYS = float(os.environ.get("RECOMMENDER_RECENCY_DAYS", "30"))
+RECOMMENDER_LOCATION_WEIGHT = float(os.environ.get("RECOMMENDER_LOCATION_WEIGHT", "0.1"))
+
+# Starter questions (/queries)
+# Answers are fresh for STARTER_CACHE_TTL seconds, then served stale for up to
+# STARTER_CACHE_STALE_TTL more while a background refresh regenerates them.
+STARTER_CACHE_SIZE = int(os.environ.get("STARTER_CACHE_SIZE", "1024"))
+STARTER_CACHE_TTL = float(os.environ.get("STARTER_CACHE_TTL", str(6 * 60 * 60)))
+STARTER_CACHE_STALE_TTL = float(os.environ.get("STARTER_CACHE_STALE_TTL", str(7 * 24 * 60 * 60)))
+STARTER_REFRESH_WORKERS = int(os.environ.get("STARTER_REFRESH_WORKERS", "2"))
+STARTER_WARMUP_ENABLED = os.environ.get("STARTER_WARMUP_ENABLED", "1") == "1"
+STARTER_WARMUP_INTERVAL = float(os.environ.get("STARTER_WARMUP_INTERVAL", str(30 * 60)))
+# Profiles warmed at startup (status x language, country/state as the sidebar sends them by default),
+# plus the STARTER_WARMUP_TOP most requested profiles seen since startup.
+STARTER_WARMUP_STATUSES = os.environ.get("STARTER_WARMUP_STATUSES", ",F1,H1B,J1,F2,H4,PR").split(",")
+STARTER_WARMUP_LANGUAGES = os.environ.get("STARTER_WARMUP_LANGUAGES", "English").split(",")
+STARTER_WARMUP_COUNTRY = os.environ.get("STARTER_WARMUP_COUNTRY", "United States")
+STARTER_WARMUP_TOP = int(os.environ.get("STARTER_WARMUP_TOP", "20"))
+
+# Multilingual answers (see multilingual.py)
+# Chats are generated in MULTILINGUAL_CANONICAL_LANGUAGE and translated per user;
+# with MULTILINGUAL_ENABLED=0 the user's language goes straight into the prompt.
+MULTILINGUAL_ENABLED = os.environ.get("MULTILINGUAL_ENABLED", "1") == "1"
+CANONICAL_LANGUAGE = os.environ.get("MULTILINGUAL_CANONICAL_LANGUAGE", "English")
+# "googletrans" or "stub" (returns the text unchanged, for offline development).
+TRANSLATOR = os.environ.get("TRANSLATOR", "googletrans")
+# "gtts", "stub" (silent WAV, for offline development) or "none" to disable /chat/audio.
+TTS_BACKEND = os.environ.get("TTS_BACKEND", "gtts")
+# gTTS accent, given as the Google Translate domain ("com", "co.uk", "co.in", ...).
+TTS_VOICE = os.environ.get("TTS_VOICE", "com")
+MULTILINGUAL_CACHE_PATH = os.environ.get("MULTILINGUAL_CACHE_PATH", str(Path(__file__).resolve().parent.parent / ".cache" / "multilingual"))
+TRANSLATION_CACHE_SIZE = int(os.environ.get("TRANSLATION_CACHE_SIZE", "4096"))
+AUDIO_CHUNK_SIZE = int(os.environ.get("AUDIO_CHUNK_SIZE", str(32 * 1024)))
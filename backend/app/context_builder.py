@@ -0,0 +1,90 @@
+import logging
+import numpy as np
+from chunking import split_sentences
+from lexical_index import tokenize
+
+# Builds the <CONTEXT> block for the answer prompt under a token budget. Prompt
+# prefill dominates generation latency, so instead of pasting whole retrieved
+# chunks the builder keeps only the sentences most relevant to the question:
+# sentences are split out of every hit, exact repeats are dropped, each one is
+# scored against the question (cosine similarity of embeddings, or term
+# overlap), and the best are kept until the budget is spent. Kept sentences are
+# emitted in their original order so passages still read naturally.
+
+logger = logging.getLogger(__name__)
+
+RANK_BONUS = 0.02  # small tie-breaker in favour of higher-ranked hits
+
+
+def estimate_tokens(text):
+    # Roughly 4 bytes per token for English with Mistral's tokenizer; UTF-8
+    # bytes keep the estimate conservative for Devanagari text.
+    return len(text.encode("utf-8")) // 4 + 1
+
+def normalize(sentence):
+    return " ".join(sentence.lower().split())
+
+
+def lexical_scores(question, sentences):
+    query_terms = set(tokenize(question))
+    if not query_terms:
+        return np.zeros(len(sentences), dtype=np.float32)
+    scores = []
+    for sentence in sentences:
+        terms = set(tokenize(sentence))
+        scores.append(len(query_terms & terms) / (len(query_terms) ** 0.5 * max(len(terms), 1) ** 0.5))
+    return np.asarray(scores, dtype=np.float32)
+
+def embedding_scores(embedding, sentences, embed):
+    vectors = np.asarray(embed(sentences), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(embedding, dtype=np.float32)
+    return vectors @ (query / max(np.linalg.norm(query), 1e-12))
+
+
+def build_context(question, documents, budget, embedding=None, embed=None, min_chars=25):
+    """
+    Returns the context text for `documents` (retrieved chunks, best first)
+    within roughly `budget` tokens. Sentences are scored by embedding similarity
+    when `embedding` and `embed` (list[str] -> vectors) are given, otherwise by
+    term overlap with the question.
+    """
+    seen = set()
+    sentences = []  # (document rank, sentence)
+    for rank, document in enumerate(documents):
+        for sentence in split_sentences(document, min_chars):
+            key = normalize(sentence)
+            if key and key not in seen:
+                seen.add(key)
+                sentences.append((rank, sentence))
+    if not sentences:
+        return ""
+
+    costs = [estimate_tokens(sentence) for _, sentence in sentences]
+    if sum(costs) <= budget:
+        order = range(len(sentences))
+    else:
+        texts = [sentence for _, sentence in sentences]
+        scores = None
+        if embedding is not None and embed is not None:
+            try:
+                scores = embedding_scores(embedding, texts, embed)
+            except Exception as e:
+                logger.warning("Sentence embedding failed, scoring context by term overlap: %s", e)
+                scores = None
+        if scores is None:
+            scores = lexical_scores(question, texts)
+        scores = scores + RANK_BONUS * np.asarray([1.0 / (rank + 1) for rank, _ in sentences], dtype=np.float32)
+
+        kept, used = [], 0
+        for i in np.argsort(-scores, kind="stable"):
+            if used + costs[i] <= budget:
+                kept.append(int(i))
+                used += costs[i]
+        order = sorted(kept)
+
+    passages = {}
+    for i in order:
+        rank, sentence = sentences[i]
+        passages.setdefault(rank, []).append(sentence)
+    return "\n\n".join(" ".join(passage) for _, passage in sorted(passages.items()))
@@ -11,11 +11,21 @@ class ChatRequest(BaseModel):
     question: str
         
 class ChatResponse:
-    def __init__(self, answer: str):
+    def __init__(self, answer: str, answer_id: str = None):
         self.answer = answer
+        self.answer_id = answer_id
     
     def to_dict(self):
-        return {"answer": self.answer}
+        response = {"answer": self.answer}
+        if self.answer_id is not None:
+            response["answer_id"] = self.answer_id
+        return response
+
+# /chat/audio
+class AudioRequest(BaseModel):
+    answer_id: str
+    language_preferance: str
+    voice: str = ""
 
 # /persomalized-queries
 class PersonalizedQueryRequest(BaseModel):
@@ -55,7 +65,7 @@ class FaqResponse:
 # /recommendations
 class Location: 
     def __init__(self, venue_name: str, address: str, city: str, state: str, is_virtual: bool, virtual_link: str = None):
-        self.venue_name = venue_name,
+        self.venue_name = venue_name
         self.address = address
         self.city = city
         self.state = state
@@ -92,8 +102,8 @@ class Event:
         self.id = id
         self.name = name
         self.description = description
-        self.start_datetime = start_datetime,
-        self.end_datetime = end_datetime,
+        self.start_datetime = start_datetime
+        self.end_datetime = end_datetime
         self.location = location
         self.category = category
         self.subcategory = subcategory
@@ -122,10 +132,18 @@ class RecommendationRequest(BaseModel):
     country: str
     state: str
     language_preferance: str
+    page: int = 1
+    page_size: int = 20
 
 class RecommendationResponse:
-    def __init__(self, events: list[Event]):
+    def __init__(self, events: list[Event], total: int = None, page: int = None, page_size: int = None):
         self.events = events
+        self.total = total
+        self.page = page
+        self.page_size = page_size
     
     def to_dict(self):
-        return {"events": [event.to_dict() for event in self.events]}
\ No newline at end of file
+        response = {"events": [event.to_dict() for event in self.events]}
+        if self.total is not None:
+            response.update({"total": self.total, "page": self.page, "page_size": self.page_size})
+        return response
\ No newline at end of file
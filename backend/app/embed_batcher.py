@@ -0,0 +1,152 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict
+import asyncio
+import threading
+import time
+
+
+class EmbedBatcher:
+    """
+    Coalesces concurrent embedding calls from many threads into batched requests.
+    Texts submitted within `window` seconds of the first pending one (or until
+    `max_batch_size` is reached) are sent together through `send(texts)`, and the
+    vectors are fanned back out to the callers. Identical texts that are already
+    queued or in flight share one result (single-flight).
+    """
+
+    def __init__(self, send, max_batch_size=32, window=0.005, max_in_flight=4):
+        self.send = send
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = window
+        self.batches = 0
+        self.batched_texts = 0
+        self.deduplicated = 0
+        self._pending = OrderedDict()  # text -> Future, waiting for a batch
+        self._in_flight = {}  # text -> Future, batch already sent
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_in_flight), thread_name_prefix="embed-batch")
+        self._worker = None
+
+    def submit(self, text) -> Future:
+        with self._cond:
+            future = self._in_flight.get(text) or self._pending.get(text)
+            if future is not None:
+                self.deduplicated += 1
+                return future
+            future = Future()
+            self._pending[text] = future
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                self._worker.start()
+            self._cond.notify()
+            return future
+
+    def embed_many(self, texts):
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.window
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = []
+                while self._pending and len(batch) < self.max_batch_size:
+                    text, future = self._pending.popitem(last=False)
+                    self._in_flight[text] = future
+                    batch.append((text, future))
+            self._executor.submit(self._send_batch, batch)
+
+    def _send_batch(self, batch):
+        try:
+            vectors = self.send([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+        else:
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+        finally:
+            with self._cond:
+                self.batches += 1
+                self.batched_texts += len(batch)
+                for text, future in batch:
+                    if self._in_flight.get(text) is future:
+                        del self._in_flight[text]
+
+    def stats(self):
+        return {"batches": self.batches, "batched_texts": self.batched_texts, "deduplicated": self.deduplicated}
+
+
+class AsyncEmbedBatcher:
+    """
+    asyncio version of EmbedBatcher for the ASGI app. `send` is a coroutine
+    function taking a list of texts. Must be used from a single event loop.
+    """
+
+    def __init__(self, send, max_batch_size=32, window=0.005):
+        self.send = send
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = window
+        self.batches = 0
+        self.batched_texts = 0
+        self.deduplicated = 0
+        self._pending = {}
+        self._in_flight = {}
+        self._flush_handle = None
+
+    def _submit(self, text):
+        future = self._in_flight.get(text) or self._pending.get(text)
+        if future is not None:
+            self.deduplicated += 1
+            return future
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[text] = future
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return future
+
+    async def embed_many(self, texts):
+        futures = [self._submit(text) for text in texts]
+        # Shield the shared futures so one cancelled caller does not fail the others.
+        return list(await asyncio.gather(*(asyncio.shield(future) for future in futures)))
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self._in_flight.update(batch)
+        asyncio.ensure_future(self._send_batch(batch))
+
+    async def _send_batch(self, batch):
+        try:
+            vectors = await self.send(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for future, vector in zip(batch.values(), vectors):
+                if not future.done():
+                    future.set_result(vector)
+        finally:
+            self.batches += 1
+            self.batched_texts += len(batch)
+            for text, future in batch.items():
+                if self._in_flight.get(text) is future:
+                    del self._in_flight[text]
+
+    def stats(self):
+        return {"batches": self.batches, "batched_texts": self.batched_texts, "deduplicated": self.deduplicated}
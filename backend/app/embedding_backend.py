@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import threading
+import ollama_client
+from config import (
+    EMBED_BACKEND, EMBED_MODEL, EMBED_LOCAL_MODEL, EMBED_LOCAL_DEVICE, EMBED_LOCAL_THREADS,
+    EMBED_LOCAL_BATCH_SIZE, EMBED_LOCAL_QUANTIZE, EMBED_LOCAL_ONNX, EMBED_LOCAL_ONNX_FILE
+)
+
+# Embedding backends shared by ingest.py and query.py.
+#
+#   ollama  vectors come from Ollama's /api/embed (EMBED_MODEL)
+#   local   the model runs in-process with sentence-transformers
+#           (EMBED_LOCAL_MODEL): no HTTP hop or JSON encoding of the vectors,
+#           optional int8 dynamic quantization or ONNX Runtime execution, and
+#           a configurable number of torch threads
+#
+# Queries must be embedded by the same model as the stored chunks. ingest.py
+# stamps the collection metadata with the backend's identity (model and
+# dimension), and check_collection refuses to serve a collection built with a
+# different model. Every batch is also checked against the expected dimension.
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingMismatch(RuntimeError):
+    """The configured embedding model does not match the stored collection."""
+
+
+class EmbeddingBackend:
+    name = None
+
+    def __init__(self, model):
+        self.model = model
+        self.dimension = None
+
+    def _embed(self, texts):
+        raise NotImplementedError
+
+    def _check(self, vectors):
+        if vectors:
+            dimension = len(vectors[0])
+            if self.dimension is None:
+                self.dimension = dimension
+            elif dimension != self.dimension:
+                raise EmbeddingMismatch(f"{self.model} returned {dimension}-d vectors, expected {self.dimension}")
+        return vectors
+
+    def embed(self, texts):
+        """list[str] -> list[list[float]]"""
+        return self._check(self._embed(texts))
+
+    async def aembed(self, texts):
+        return await asyncio.to_thread(self.embed, texts)
+
+    def identity(self):
+        """Collection metadata recorded by ingest (dimension is probed if not yet known)."""
+        if self.dimension is None:
+            self.embed(["dimension probe"])
+        return {"embed_backend": self.name, "embed_model": self.model, "embed_dim": self.dimension}
+
+
+class OllamaBackend(EmbeddingBackend):
+    name = "ollama"
+
+    def __init__(self, model=EMBED_MODEL):
+        super().__init__(model)
+
+    def _embed(self, texts):
+        return ollama_client.embed(texts, self.model)
+
+    async def aembed(self, texts):
+        return self._check(await ollama_client.aembed(texts, self.model))
+
+
+class LocalBackend(EmbeddingBackend):
+    """
+    sentence-transformers on the CPU (or `device`). The model is loaded on first
+    use. Batches are encoded one at a time so each gets all `threads` torch
+    threads; concurrent callers are coalesced upstream by the EmbedBatcher.
+    Vectors are L2-normalized, like Ollama's /api/embed output.
+    """
+    name = "local"
+
+    def __init__(self, model=EMBED_LOCAL_MODEL, device=EMBED_LOCAL_DEVICE, threads=EMBED_LOCAL_THREADS,
+                 batch_size=EMBED_LOCAL_BATCH_SIZE, quantize=EMBED_LOCAL_QUANTIZE, onnx=EMBED_LOCAL_ONNX,
+                 onnx_file=EMBED_LOCAL_ONNX_FILE):
+        super().__init__(model)
+        self.device = device
+        self.threads = threads
+        self.batch_size = max(1, batch_size)
+        self.quantize = quantize
+        self.onnx = onnx
+        self.onnx_file = onnx_file
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+        import torch
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        kwargs = {"device": self.device, "trust_remote_code": True}
+        if self.onnx:
+            # For int8 with ONNX Runtime, point onnx_file at a quantized export
+            # (e.g. "onnx/model_qint8_avx512.onnx").
+            kwargs["backend"] = "onnx"
+            if self.onnx_file:
+                kwargs["model_kwargs"] = {"file_name": self.onnx_file}
+        model = SentenceTransformer(self.model, **kwargs)
+        if self.quantize and not self.onnx:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        model.eval()
+        if self.dimension is None:
+            self.dimension = model.get_sentence_embedding_dimension()
+        logger.info("Loaded local embedding model %s (%s, dim %s, %s)", self.model,
+                    "onnx" if self.onnx else "torch", self.dimension, "int8" if self.quantize else "fp32")
+        return model
+
+    def _embed(self, texts):
+        with self._lock:
+            if self._model is None:
+                self._model = self._load()
+            vectors = self._model.encode(
+                list(texts), batch_size=self.batch_size, normalize_embeddings=True,
+                convert_to_numpy=True, show_progress_bar=False
+            )
+        return vectors.tolist()
+
+
+BACKENDS = {"ollama": OllamaBackend, "local": LocalBackend}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def create_backend(name=EMBED_BACKEND):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {name!r}; expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
+
+def get_backend():
+    """The process-wide backend selected by EMBED_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+
+def check_collection(metadata, backend):
+    """
+    Raises EmbeddingMismatch if the collection metadata written by ingest names
+    another model or dimension. Collections ingested before the metadata existed
+    are accepted as is.
+    """
+    metadata = metadata or {}
+    stored_model = metadata.get("embed_model")
+    if stored_model is None:
+        logger.warning("Collection has no embedding metadata; assuming it was built with %s", backend.model)
+        return
+    if stored_model != backend.model:
+        raise EmbeddingMismatch(
+            f"Collection was embedded with {metadata.get('embed_backend', '?')}:{stored_model} but "
+            f"EMBED_BACKEND={backend.name} uses {backend.model}; re-run ingest.py --full or switch back"
+        )
+    stored_dim = metadata.get("embed_dim")
+    if stored_dim:
+        if backend.dimension is not None and backend.dimension != stored_dim:
+            raise EmbeddingMismatch(f"Collection has {stored_dim}-d vectors but {backend.model} produces {backend.dimension}-d")
+        backend.dimension = stored_dim
@@ -0,0 +1,199 @@
+from datetime import datetime
+import bisect
+import heapq
+import itertools
+import json
+import os
+import re
+import threading
+from custom_type import Location, Organizer, Event
+
+# In-memory event catalog for /recommendations. events.json is parsed once (and
+# again only when its mtime changes); Event objects and inverted indexes over
+# state, category, subcategory, tags and target_audience are built at load time
+# so a request only touches the postings for the user's profile.
+
+US_STATES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA", "colorado": "CO",
+    "connecticut": "CT", "delaware": "DE", "district of columbia": "DC", "washington dc": "DC", "florida": "FL",
+    "georgia": "GA", "hawaii": "HI", "idaho": "ID", "illinois": "IL", "indiana": "IN", "iowa": "IA", "kansas": "KS",
+    "kentucky": "KY", "louisiana": "LA", "maine": "ME", "maryland": "MD", "massachusetts": "MA", "michigan": "MI",
+    "minnesota": "MN", "mississippi": "MS", "missouri": "MO", "montana": "MT", "nebraska": "NE", "nevada": "NV",
+    "new hampshire": "NH", "new jersey": "NJ", "new mexico": "NM", "new york": "NY", "north carolina": "NC",
+    "north dakota": "ND", "ohio": "OH", "oklahoma": "OK", "oregon": "OR", "pennsylvania": "PA", "rhode island": "RI",
+    "south carolina": "SC", "south dakota": "SD", "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT",
+    "virginia": "VA", "washington": "WA", "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+}
+
+# Sidebar interests mapped onto the vocabulary used by events.json.
+INTEREST_TERMS = {
+    "legal services": ["immigration", "visa", "legal"],
+    "job search": ["career", "career_development", "career_fair", "networking", "interview", "resume", "job_seekers"],
+    "language learning": ["language", "english", "educational"],
+    "cultural events": ["cultural", "festival", "festivals", "culture", "traditional"],
+    "healthcare": ["health", "health_wellness", "mental_health", "wellness"],
+    "education": ["educational", "university_tour", "academic"],
+    "technology": ["tech", "science_technology", "stem", "innovation"],
+    "arts": ["art", "arts", "museums", "music", "dance"],
+    "social services": ["community", "community_service", "volunteer"],
+    "science": ["science_technology", "stem", "research"],
+    "business": ["professional", "networking", "entrepreneurs", "business"],
+}
+
+# Visa status mapped onto target_audience terms.
+STATUS_AUDIENCES = {
+    "F1": ["students", "international_students", "f1_students"],
+    "M1": ["students", "international_students"],
+    "J1": ["students", "international_students", "researchers"],
+    "F2": ["families"],
+    "H1B": ["professionals", "international_professionals", "young_professionals", "tech_professionals"],
+    "H4": ["families"],
+    "PR": ["families", "professionals"],
+    "USC": ["families", "professionals"],
+}
+
+INDEXED_FIELDS = ("state", "category", "subcategory", "tags", "target_audience")
+FIELD_WEIGHTS = {"tags": 3.0, "subcategory": 2.0, "category": 2.0, "target_audience": 1.0}
+STATE_WEIGHT = 2.0
+VIRTUAL_WEIGHT = 1.0
+
+
+def terms(value):
+    """A field value plus its underscore-separated parts, lowercased."""
+    value = str(value).lower()
+    return {value, *value.split("_")} - {""}
+
+def interest_terms(interest):
+    interest = interest.lower().strip()
+    words = [w for w in re.split(r"[^a-z0-9]+", interest) if w and w not in {"events", "services"}]
+    return set(INTEREST_TERMS.get(interest, [])) | set(words)
+
+def normalize_state(state):
+    state = (state or "").strip()
+    return US_STATES.get(state.lower(), state.upper())
+
+
+def build_event(event):
+    location = Location(
+        venue_name=event['location']['venue_name'],
+        address=event['location']['address'],
+        city=event['location']['city'],
+        state=event['location']['state'],
+        is_virtual=event['location']['is_virtual']
+    )
+    organizer = Organizer(
+        name=event['organizer']['name'],
+        type=event['organizer']['type'],
+        contact_email=event['organizer']['contact_email'],
+        website=event['organizer']['website']
+    )
+    return Event(
+        id=event['id'],
+        name=event['name'],
+        description=event['description'],
+        start_datetime=event['start_datetime'],
+        end_datetime=event['end_datetime'],
+        location=location,
+        category=event['category'],
+        subcategory=event['subcategory'],
+        tags=event['tags'],
+        organizer=organizer,
+        image_url=event['image_url']
+    )
+
+def start_timestamp(event):
+    try:
+        return datetime.fromisoformat(event['start_datetime']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return float("inf")
+
+
+class _Snapshot:
+    def __init__(self, raw_events):
+        self.raw = raw_events
+        self.events = [build_event(event) for event in raw_events]
+        self.start = [start_timestamp(event) for event in raw_events]
+        self.by_start = sorted(range(len(raw_events)), key=self.start.__getitem__)
+        self.sorted_start = [self.start[i] for i in self.by_start]
+        self.virtual = {i for i, event in enumerate(raw_events) if event['location'].get('is_virtual')}
+        self.index = {field: {} for field in INDEXED_FIELDS}
+        for i, event in enumerate(raw_events):
+            values = {
+                "state": [normalize_state(event['location']['state'])],
+                "category": [event.get('category', '')],
+                "subcategory": [event.get('subcategory', '')],
+                "tags": event.get('tags', []),
+                "target_audience": event.get('target_audience', []),
+            }
+            for field, field_values in values.items():
+                postings = self.index[field]
+                if field == "state":
+                    keys = set(field_values)
+                else:
+                    keys = set().union(*(terms(v) for v in field_values)) if field_values else set()
+                for key in keys:
+                    postings.setdefault(key, set()).add(i)
+
+
+class EventStore:
+    def __init__(self, path):
+        self.path = path
+        self._mtime = None
+        self._snapshot = _Snapshot([])
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            raise FileNotFoundError(self.path)
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    with open(self.path, 'r') as file:
+                        self._snapshot = _Snapshot(json.load(file))
+                    self._mtime = mtime
+        return self._snapshot
+
+    def recommend(self, interests=(), state=None, status=None, page=1, page_size=20, now=None):
+        """
+        Ranks events for a user profile and returns (events, total) for the
+        requested page. Events matching nothing in the profile are still
+        returned after the matching ones, upcoming events first.
+        """
+        snap = self.snapshot()
+        scores = {}
+
+        def add(postings, weight):
+            for i in postings:
+                scores[i] = scores.get(i, 0.0) + weight
+
+        wanted = set().union(*(interest_terms(i) for i in interests)) if interests else set()
+        for field in ("tags", "subcategory", "category"):
+            for term in wanted:
+                add(snap.index[field].get(term, ()), FIELD_WEIGHTS[field])
+        for term in STATUS_AUDIENCES.get((status or "").upper(), []):
+            add(snap.index["target_audience"].get(term, ()), FIELD_WEIGHTS["target_audience"])
+        if state:
+            add(snap.index["state"].get(normalize_state(state), ()), STATE_WEIGHT)
+            add(snap.virtual, VIRTUAL_WEIGHT)
+
+        now = now if now is not None else datetime.now().timestamp()
+        total = len(snap.events)
+        page = max(1, page)
+        page_size = max(1, page_size)
+        top = page * page_size
+
+        def rank_key(i):
+            # Higher score first, then upcoming before past, then soonest first.
+            start = snap.start[i]
+            return (-scores.get(i, 0.0), start < now, start if start >= now else -start)
+
+        ranked = heapq.nsmallest(top, scores, key=rank_key)
+        if len(ranked) < top:
+            # Pad with unmatched events in date order: upcoming soonest first, then most recent past.
+            split = bisect.bisect_left(snap.sorted_start, now)
+            by_date = itertools.chain(snap.by_start[split:], reversed(snap.by_start[:split]))
+            padding = (i for i in by_date if i not in scores)
+            ranked.extend(itertools.islice(padding, top - len(ranked)))
+        return [snap.events[i] for i in ranked[top - page_size:top]], total
@@ -0,0 +1,184 @@
+from pathlib import Path
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+
+# Exact vector index over a memory-mapped matrix, an alternative to Chroma's
+# HNSW for a corpus of a few thousand chunks. ingest.py exports every chunk
+# embedding, L2-normalized, to a float32 .npy file and the ids, documents and
+# metadata to a JSON side file. ExactIndex maps the matrix read-only, so it
+# loads in milliseconds and every worker process shares the same page-cache
+# pages. A query is one matrix-vector product plus a partial sort, which gives
+# exact top-k results; Chroma-style `where` filters become boolean masks over
+# the metadata columns.
+#
+# Layout of the index directory:
+#   index.json            {"version": ..., "count": ..., "dim": ..., "metadata": {...}}
+#   vectors-<version>.npy
+#   chunks-<version>.json {"ids": [...], "documents": [...], "metadatas": [...]}
+# index.json is replaced last, so readers always see a complete version.
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim != 2:
+        return vectors.reshape(0, 0)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def _write_json(path, data):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def export_index(path, ids, embeddings, documents, metadatas, metadata=None):
+    """Writes a new version of the index at `path` and removes older versions."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    version = str(time.time_ns())
+    vectors = np.ascontiguousarray(normalize_rows(embeddings), dtype=np.float32)
+    try:
+        with open(path / "index.json") as f:
+            previous = json.load(f)["version"]
+    except (OSError, ValueError, KeyError):
+        previous = None
+
+    vectors_path = path / f"vectors-{version}.npy"
+    tmp_path = path / f"vectors-{version}.tmp.npy"
+    np.save(tmp_path, vectors)
+    os.replace(tmp_path, vectors_path)
+    _write_json(path / f"chunks-{version}.json", {"ids": list(ids), "documents": list(documents), "metadatas": list(metadatas)})
+    _write_json(path / "index.json", {
+        "version": version,
+        "count": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "metadata": metadata or {},
+    })
+
+    # The previous version is kept for readers that are loading it right now;
+    # mapped pages of older ones stay valid until their readers reload.
+    keep = {version, previous}
+    for old in list(path.glob("vectors-*.npy")) + list(path.glob("chunks-*.json")):
+        if not any(v and v in old.name for v in keep):
+            old.unlink(missing_ok=True)
+    return vectors.shape
+
+
+class _Snapshot:
+    """One loaded version of the index; replaced as a whole on reload."""
+
+    def __init__(self, vectors, ids, documents, metadatas):
+        self.vectors = vectors
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.rows = {doc_id: row for row, doc_id in enumerate(ids)}
+        self._columns = {}
+
+    def hits(self, rows):
+        return [(self.ids[i], self.documents[i], self.metadatas[i]) for i in rows]
+
+    def column(self, field):
+        column = self._columns.get(field)
+        if column is None:
+            column = self._columns[field] = np.array([meta.get(field) for meta in self.metadatas], dtype=object)
+        return column
+
+    def mask(self, where):
+        """Boolean row mask for a Chroma `where` filter ($and, $or, $eq, $ne, $in, $nin)."""
+        masks = []
+        for key, condition in where.items():
+            if key in ("$and", "$or"):
+                parts = [self.mask(part) for part in condition]
+                combine = np.logical_and if key == "$and" else np.logical_or
+                masks.append(combine.reduce(parts) if parts else np.ones(len(self.ids), dtype=bool))
+                continue
+            column = self.column(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                if op == "$eq":
+                    masks.append(column == value)
+                elif op == "$ne":
+                    masks.append(column != value)
+                elif op == "$in":
+                    masks.append(np.isin(column, list(value)))
+                elif op == "$nin":
+                    masks.append(~np.isin(column, list(value)))
+                else:
+                    raise ValueError(f"Unsupported where operator {op!r}")
+        return np.logical_and.reduce(masks) if masks else np.ones(len(self.ids), dtype=bool)
+
+
+class ExactIndex:
+    """
+    Read side of the index. Reloads itself when ingest writes a new version
+    (index.json changes), like the BM25 index in query.py.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.metadata = {}
+        self._snapshot = _Snapshot(np.zeros((0, 0), dtype=np.float32), [], [], [])
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def __len__(self):
+        return len(self._snapshot.ids)
+
+    def refresh(self):
+        index_path = self.path / "index.json"
+        try:
+            mtime = os.path.getmtime(index_path)
+        except OSError:
+            return self
+        if mtime == self._mtime:
+            return self
+        with self._lock:
+            if mtime == self._mtime:
+                return self
+            with open(index_path) as f:
+                info = json.load(f)
+            vectors = np.load(self.path / f"vectors-{info['version']}.npy", mmap_mode="r")
+            with open(self.path / f"chunks-{info['version']}.json") as f:
+                chunks = json.load(f)
+            if len(chunks["ids"]) != vectors.shape[0]:
+                raise ValueError(f"Exact index {info['version']} is inconsistent: {vectors.shape[0]} vectors, {len(chunks['ids'])} ids")
+            self._snapshot = _Snapshot(vectors, chunks["ids"], chunks["documents"], chunks["metadatas"])
+            self.metadata = info.get("metadata", {})
+            self._mtime = mtime
+            logger.info("Loaded exact index %s (%d vectors)", info["version"], len(chunks["ids"]))
+        return self
+
+    def query(self, embedding, n_results, where=None):
+        """Exact top-k by cosine similarity; returns (id, document, metadata) hits."""
+        snapshot = self._snapshot
+        if not snapshot.ids:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        if where:
+            rows = np.flatnonzero(snapshot.mask(where))
+            if rows.size == 0:
+                return []
+            scores = snapshot.vectors[rows] @ query
+        else:
+            rows = None
+            scores = snapshot.vectors @ query
+        k = min(n_results, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        if rows is not None:
+            top = rows[top]
+        return snapshot.hits(top.tolist())
+
+    def get(self, ids):
+        """(id, document, metadata) for the ids that exist, in the given order."""
+        snapshot = self._snapshot
+        return snapshot.hits([snapshot.rows[doc_id] for doc_id in ids if doc_id in snapshot.rows])
@@ -0,0 +1,65 @@
+from pathlib import Path
+import fitz  # PyMuPDF
+from langdetect import detect, DetectorFactory
+from chunking import chunk_document
+
+# Extraction stage of the ingest pipeline. Everything here is CPU-bound and
+# free of Chroma/HTTP state so it can run in worker processes.
+
+DetectorFactory.seed = 0  # make language detection deterministic across runs
+
+# 1. Utility Functions
+def extract_pages(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        return [page.get_text() for page in doc]
+
+def detect_lang(text):
+    try:
+        return detect(text)
+    except:
+        return "unknown"
+
+def guess_topic_from_path(pdf_path):
+    folder = pdf_path.parent.name.lower()
+    fname = pdf_path.name.lower()
+
+    if "bank" in folder or "account" in fname:
+        return "banking"
+    if "housing" in folder or "rent" in fname or "apartment" in fname:
+        return "housing"
+    if "immigration" in folder or "visa" in fname or "opt" in fname or "f1" in fname:
+        return "immigration"
+    if "tax" in folder or "irs" in fname or "social secur" in fname:
+        return "taxation"
+    if "driver" in folder or "driving" in folder or "dmv" in fname:
+        return "driving"
+    if "health" in folder or "medical" in fname or "insurance" in fname:
+        return "health"
+    if "faq" in folder or "frequently" in fname or "guide" in fname:
+        return "faq"
+    if "nepali" in folder or "consulate" in fname or "camp" in fname:
+        return "nepali_info"
+    if "student" in fname or "university" in fname:
+        return "student_life"
+    if "asylum" in fname:
+        return "asylum"
+    if "green card" in fname:
+        return "green_card"
+    return "general"
+
+# 2. Worker entry point: PDF -> chunks with per-chunk metadata
+def prepare_pdf(pdf_path, options):
+    """options are chunk_document's keyword arguments (strategy, size, overlap, parent_size)."""
+    pdf_path = Path(pdf_path)
+    pages = extract_pages(pdf_path)
+    chunks, parents = chunk_document(pages, **options)
+    return {
+        "path": str(pdf_path),
+        "characters": sum(len(page) for page in pages),
+        "topic": guess_topic_from_path(pdf_path),
+        "chunks": [chunk.text for chunk in chunks],
+        "languages": [detect_lang(chunk.text) for chunk in chunks],
+        "pages": [(chunk.page_start, chunk.page_end) for chunk in chunks],
+        "parent_index": [chunk.parent for chunk in chunks],
+        "parents": [parent.text for parent in parents],
+    }
@@ -0,0 +1,86 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import threading
+from custom_type import QAPair, FaqResponse
+
+# In-memory FAQ service for /faqs. faqs.json is grouped by visa type once, and
+# the JSON body for every (visa_type, language) pair is serialized up front
+# together with its ETag, so serving the FAQ tab is a dictionary lookup.
+# Translations are produced offline by translate_faqs.py and stored as
+# data/faq_translations/<code>.json, keyed by faq_key(); untranslated entries
+# fall back to English. Files are reloaded when their mtime changes.
+
+LANGUAGE_CODES = {"english": "en", "nepali": "ne", "hindi": "hi"}
+
+
+def language_code(language):
+    language = (language or "").strip().lower()
+    return LANGUAGE_CODES.get(language, language or "en")
+
+def faq_key(faq):
+    return hashlib.sha1(f"{faq['question']}\n{faq['answer']}".encode("utf-8")).hexdigest()
+
+def serialize(faqs):
+    body = json.dumps(FaqResponse([QAPair(q, a) for q, a in faqs]).to_dict(), ensure_ascii=False).encode("utf-8")
+    return body, '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+class FaqStore:
+    def __init__(self, path, translations_dir):
+        self.path = Path(path)
+        self.translations_dir = Path(translations_dir)
+        self._version = None
+        self._responses = {}
+        self._empty = serialize([])
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        try:
+            version = [os.path.getmtime(self.path)]
+        except OSError:
+            raise FileNotFoundError(self.path)
+        if self.translations_dir.is_dir():
+            version += sorted((p.name, p.stat().st_mtime) for p in self.translations_dir.glob("*.json"))
+        return version
+
+    def _load(self):
+        with open(self.path, "r") as file:
+            faqs = json.load(file)
+        translations = {"en": {}}
+        if self.translations_dir.is_dir():
+            for path in self.translations_dir.glob("*.json"):
+                with open(path, "r") as file:
+                    translations[path.stem] = json.load(file)
+
+        grouped = {}
+        for faq in faqs:
+            grouped.setdefault(faq['visa_type'], []).append(faq)
+
+        responses = {}
+        for visa_type, entries in grouped.items():
+            for code, translated in translations.items():
+                pairs = []
+                for faq in entries:
+                    entry = translated.get(faq_key(faq), faq)
+                    pairs.append((entry['question'], entry['answer']))
+                responses[(visa_type, code)] = serialize(pairs)
+        return responses
+
+    def response(self, visa_type, language="English"):
+        """Returns the pre-serialized (body, etag) for a visa type and language."""
+        version = self._current_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._responses = self._load()
+                    self._version = version
+        responses = self._responses
+        return responses.get((visa_type, language_code(language))) or responses.get((visa_type, "en"), self._empty)
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
@@ -1,138 +1,351 @@
 from pathlib import Path
-import fitz  # PyMuPDF
-import chromadb
 from chromadb.config import Settings
-from chromadb.utils import embedding_functions
 from chromadb import PersistentClient  
-from langdetect import detect
-import uuid
-import re
-import requests
-import subprocess
+from extract import prepare_pdf
+from chunking import ParentStore
+from embedding_backend import get_backend, LocalBackend
+from lexical_index import LexicalIndex
+from query_router import compute_topic_stats, save_topic_stats
+from exact_index import export_index
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from config import (
+    INGEST_EMBED_BATCH_SIZE, INGEST_EMBED_CONCURRENCY, INGEST_ADD_BATCH_SIZE,
+    INGEST_CHUNK_SIZE, INGEST_WORKERS, INGEST_QUEUE_SIZE, LEXICAL_INDEX_PATH, CHROMA_PATH, LOG_LEVEL,
+    CHUNK_STRATEGY, CHUNK_OVERLAP, CHUNK_PARENT_SIZE, EXACT_INDEX_PATH
+)
+import multiprocessing
+import threading
+import queue
 import json
+import logging
 import os
 os.environ["CHROMA_TELEMETRY_DISABLED"] = "1"
 
+logger = logging.getLogger(__name__)
+
+
+# 1. Embedding Function class over the configured embedding backend
+class BatchedEmbeddingFunction:
+    """
+    Embeds texts with an embedding backend (see embedding_backend.py). Texts are
+    sent in batches of `batch_size`, with at most `max_in_flight` batches
+    outstanding at any time. The in-process backend already uses every torch
+    thread for one batch, so it runs its batches one after another.
+    """
 
-# 1. Clean text helper
-def clean_text(text):
-    text = re.sub(r'\s+', ' ', text)  # Remove extra whitespace
-    return text.strip()
+    def __init__(self, backend, batch_size=INGEST_EMBED_BATCH_SIZE, max_in_flight=INGEST_EMBED_CONCURRENCY):
+        self.backend = backend
+        self.model = backend.model
+        self.batch_size = max(1, batch_size)
+        self.max_in_flight = 1 if isinstance(backend, LocalBackend) else max(1, max_in_flight)
 
-# 2. Embedding Function class for Ollama
-class OllamaEmbeddingFunction:
-    def __init__(self, model="nomic-embed-text"):
-        self.model = model
-        self.url = "http://localhost:11434/api/embed"
+    def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        return self.backend.embed(batch)
 
     def __call__(self, input: list[str]) -> list[list[float]]:
-        embeddings = []
-        for text in input:
-            response = requests.post(
-                self.url,
-                json={"model": self.model, "input": text}
-            )
-            response.raise_for_status()
-            data = response.json()
-            embeddings.append(data["embeddings"])
-        return embeddings
-    
+        batches = [input[i:i + self.batch_size] for i in range(0, len(input), self.batch_size)]
+        if len(batches) <= 1 or self.max_in_flight == 1:
+            return [vector for batch in batches for vector in self._embed_batch(batch)]
+
+        # Keep a bounded window of batches in flight; results are stitched back in order.
+        results = [None] * len(batches)
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            pending = {}
+            next_batch = 0
+            while next_batch < len(batches) or pending:
+                while next_batch < len(batches) and len(pending) < self.max_in_flight:
+                    future = executor.submit(self._embed_batch, batches[next_batch])
+                    pending[future] = next_batch
+                    next_batch += 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
 
-# 3. Setup Persistent ChromaDB client
+        return [vector for batch in results for vector in batch]
+
+# 2. Setup Persistent ChromaDB client and collection (opened on first use)
 base_path = Path(__file__).resolve().parent.parent
-persist_path = base_path / ".chromadb"
+persist_path = Path(CHROMA_PATH)
+manifest_path = persist_path / "ingest_manifest.json"
+pdf_dir = base_path / "data" / "PDFs"
 
-chroma_client = PersistentClient(
-    path=str(persist_path),
-    settings=Settings(anonymized_telemetry=False)
-)
+embedding_function = BatchedEmbeddingFunction(get_backend())
 
-# 4. Create or load collection
-embedding_function = OllamaEmbeddingFunction()
+_chroma_client = None
+_collection = None
+# Parent passages for small-to-big retrieval (only written when CHUNK_PARENT_SIZE > 0).
+parent_store = ParentStore(persist_path / "parents.sqlite")
+# BM25 index kept in step with the collection; saved at the end of ingest().
+lexical_index = LexicalIndex.load(LEXICAL_INDEX_PATH)
 
-collection = chroma_client.get_or_create_collection(
-    name="immigration_docs",
-    embedding_function=embedding_function
-)
+def get_collection():
+    global _chroma_client, _collection
+    if _collection is None:
+        if _chroma_client is None:
+            _chroma_client = PersistentClient(
+                path=str(persist_path),
+                settings=Settings(anonymized_telemetry=False)
+            )
+        _collection = _chroma_client.get_or_create_collection(
+            name="immigration_docs",
+            embedding_function=embedding_function
+        )
+    return _collection
+
+def ensure_embedding_metadata():
+    """
+    Records the embedding backend's model and dimension in the collection
+    metadata, which query.py checks before serving. Vectors from another model
+    cannot be mixed in, so a collection built with one is dropped and rebuilt.
+    Returns True when the collection was dropped.
+    """
+    global _collection
+    identity = embedding_function.backend.identity()
+    stored = get_collection().metadata or {}
+    dropped = False
+    if stored.get("embed_model") is not None and get_collection().count() > 0 and (
+        (stored.get("embed_model"), stored.get("embed_dim")) != (identity["embed_model"], identity["embed_dim"])
+    ):
+        logger.warning("Collection was embedded with %s (dim %s); rebuilding it for %s (dim %s)",
+                       stored.get("embed_model"), stored.get("embed_dim"), identity["embed_model"], identity["embed_dim"])
+        _chroma_client.delete_collection("immigration_docs")
+        _collection = None
+        stored = {}
+        dropped = True
+    if any(stored.get(key) != value for key, value in identity.items()):
+        # hnsw:* settings are fixed at creation and may not be passed to modify().
+        metadata = {key: value for key, value in {**stored, **identity}.items() if not key.startswith("hnsw:")}
+        get_collection().modify(metadata=metadata)
+    return dropped
+
+# 3. Manifest helpers
+# The manifest records, per source file, the content hash, the parameters the
+# chunks were produced with and the chunk ids written to the collection. It lets
+# a re-run skip unchanged files, replace changed ones and prune removed ones.
+def chunking_options():
+    return {"strategy": CHUNK_STRATEGY, "size": INGEST_CHUNK_SIZE, "overlap": CHUNK_OVERLAP, "parent_size": CHUNK_PARENT_SIZE}
+
+def chunking_params():
+    return {**chunking_options(), "embed_model": embedding_function.model}
+
+def file_hash(pdf_path):
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def source_key(pdf_path):
+    return pdf_path.relative_to(pdf_dir).as_posix()
+
+def chunk_id(source, content_hash, index):
+    return f"{source}::{content_hash[:16]}::{index}"
+
+def parent_id(source, content_hash, index):
+    return f"{source}::{content_hash[:16]}::p{index}"
+
+def load_manifest():
+    if not manifest_path.exists():
+        return {"files": {}}
+    with open(manifest_path, "r") as f:
+        return json.load(f)
 
-# 5. Utility Functions
-def extract_text(pdf_path):
-    doc = fitz.open(pdf_path)
-    return "\n".join([p.get_text() for p in doc])
-
-def split_chunks(text, size=777):
-    words = text.split()
-    return [" ".join(words[i:i + size]) for i in range(0, len(words), size)]
-
-def detect_lang(text):
-    try:
-        return detect(text)
-    except:
-        return "unknown"
-
-def guess_topic_from_path(pdf_path):
-    folder = pdf_path.parent.name.lower()
-    fname = pdf_path.name.lower()
-
-    if "bank" in folder or "account" in fname:
-        return "banking"
-    if "housing" in folder or "rent" in fname or "apartment" in fname:
-        return "housing"
-    if "immigration" in folder or "visa" in fname or "opt" in fname or "f1" in fname:
-        return "immigration"
-    if "tax" in folder or "irs" in fname or "social secur" in fname:
-        return "taxation"
-    if "driver" in folder or "driving" in folder or "dmv" in fname:
-        return "driving"
-    if "health" in folder or "medical" in fname or "insurance" in fname:
-        return "health"
-    if "faq" in folder or "frequently" in fname or "guide" in fname:
-        return "faq"
-    if "nepali" in folder or "consulate" in fname or "camp" in fname:
-        return "nepali_info"
-    if "student" in fname or "university" in fname:
-        return "student_life"
-    if "asylum" in fname:
-        return "asylum"
-    if "green card" in fname:
-        return "green_card"
-    return "general"
-
-# 6. Process PDF and add to collection
-def process_pdf(pdf_path):
-    raw = extract_text(pdf_path)
-    print(f" Processing: {pdf_path.name}")
-    print(f" Characters: {len(raw)}")
-
-    cleaned = clean_text(raw)
-    chunks = split_chunks(cleaned)
-    topic = guess_topic_from_path(pdf_path)
+def save_manifest(manifest):
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def delete_ids(ids):
+    collection = get_collection()
+    for start in range(0, len(ids), INGEST_ADD_BATCH_SIZE):
+        collection.delete(ids=ids[start:start + INGEST_ADD_BATCH_SIZE])
+    lexical_index.remove(ids)
+
+def backfill_lexical_index(files):
+    # Chunks indexed before the BM25 index existed are copied over from Chroma.
+    missing = [i for entry in files.values() for i in entry["chunk_ids"] if i not in lexical_index]
+    collection = get_collection()
+    for start in range(0, len(missing), INGEST_ADD_BATCH_SIZE):
+        batch = collection.get(ids=missing[start:start + INGEST_ADD_BATCH_SIZE], include=["documents", "metadatas"])
+        lexical_index.add(batch["ids"], batch["documents"], batch["metadatas"])
+    if missing:
+        logger.info("Added %d existing chunks to the lexical index", len(missing))
+
+def export_collection():
+    # One pass over the collection feeds the query router's per-topic mean
+    # embeddings and per-language counts, and the exact vector index.
+    collection = get_collection()
+    everything = collection.get(include=["embeddings", "documents", "metadatas"])
+    if len(everything["ids"]) > 0:
+        save_topic_stats(compute_topic_stats(everything["embeddings"], everything["metadatas"]))
+    metadata = {key: value for key, value in (collection.metadata or {}).items() if key.startswith("embed_")}
+    shape = export_index(EXACT_INDEX_PATH, everything["ids"], everything["embeddings"],
+                         everything["documents"], everything["metadatas"], metadata)
+    logger.info("Exported exact index %s to %s", shape, EXACT_INDEX_PATH)
+
+# 4. Embed prepared chunks and upsert into collection
+def write_prepared(prepared, content_hash, previous_ids=(), previous_parent_ids=()):
+    """Embeds and writes one prepared PDF; returns (chunk ids, parent ids)."""
+    pdf_path = Path(prepared["path"])
+    chunks = prepared["chunks"]
+    source = source_key(pdf_path)
+    logger.debug("Processing %s (%d characters)", pdf_path.name, prepared['characters'])
 
     embeddings = embedding_function(chunks)
+    parent_ids = [parent_id(source, content_hash, j) for j in range(len(prepared["parents"]))]
+    metadatas = []
+    for language, (page_start, page_end), parent in zip(prepared["languages"], prepared["pages"], prepared["parent_index"]):
+        metadata = {
+            "source": pdf_path.name,
+            "path": source,
+            "language": language,
+            "topic": prepared["topic"],
+            "page_start": page_start,
+            "page_end": page_end
+        }
+        if parent is not None:
+            metadata["parent_id"] = parent_ids[parent]
+        metadatas.append(metadata)
+    ids = [chunk_id(source, content_hash, i) for i in range(len(chunks))]
+
+    # Drop chunks of the previous version that the new version does not overwrite.
+    stale_ids = sorted(set(previous_ids) - set(ids))
+    if stale_ids:
+        delete_ids(stale_ids)
+    parent_store.delete(sorted(set(previous_parent_ids) - set(parent_ids)))
+    parent_store.put(parent_ids, prepared["parents"])
 
-    for i, chunk in enumerate(chunks):
-        collection.add(
-            documents=[chunk],
-            embeddings=[embeddings[i]][0],
-            metadatas=[{
-                "source": pdf_path.name,
-                "language": detect_lang(chunk),
-                "topic": topic
-            }],
-            ids=[str(uuid.uuid4())]
+    # Write in bulk; Chroma caps the size of a single upsert call.
+    collection = get_collection()
+    for start in range(0, len(chunks), INGEST_ADD_BATCH_SIZE):
+        end = start + INGEST_ADD_BATCH_SIZE
+        collection.upsert(
+            documents=chunks[start:end],
+            embeddings=embeddings[start:end],
+            metadatas=metadatas[start:end],
+            ids=ids[start:end]
         )
+    lexical_index.add(ids, chunks, metadatas)
 
-    print(f" Ingested {pdf_path.name}")
-    print(f" Chunked into {len(chunks)} parts\n")
+    logger.info("Ingested %s: %d chunks, %d parent passages", pdf_path.name, len(chunks), len(parent_ids))
+    return ids, parent_ids
 
-# 7. Run on all PDFs
-pdf_dir = base_path / "data" / "PDFs"
-pdf_files = list(pdf_dir.glob("**/*.pdf"))
+def process_pdf(pdf_path, content_hash, previous_ids=(), previous_parent_ids=()):
+    return write_prepared(prepare_pdf(pdf_path, chunking_options()), content_hash, previous_ids, previous_parent_ids)
+
+# 5. Extraction stage: a process pool feeding a bounded queue
+_DONE = object()
+
+def extract_in_background(pdf_paths, workers=INGEST_WORKERS, queue_size=INGEST_QUEUE_SIZE):
+    """
+    Runs prepare_pdf for every path on a process pool and streams the results
+    through a bounded queue, in completion order. Items are (path, result, error)
+    tuples followed by a final _DONE sentinel. At most workers + queue_size
+    prepared documents exist at once, so memory stays flat on large corpora and
+    extraction of the next files overlaps with embedding of the current one.
+    """
+    results = queue.Queue(maxsize=max(1, queue_size))
+
+    def produce():
+        # spawn keeps workers independent of the parent's Chroma and HTTP state.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=context) as pool:
+            pending = {}
+            remaining = iter(pdf_paths)
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < max(1, workers):
+                    path = next(remaining, None)
+                    if path is None:
+                        exhausted = True
+                        break
+                    pending[pool.submit(prepare_pdf, str(path), chunking_options())] = path
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    try:
+                        results.put((path, future.result(), None))
+                    except Exception as e:
+                        results.put((path, None, e))
+        results.put(_DONE)
+
+    threading.Thread(target=produce, name="ingest-extract", daemon=True).start()
+    while True:
+        item = results.get()
+        if item is _DONE:
+            return
+        yield item
+
+# 6. Incrementally ingest all PDFs
+def ingest(full=False):
+    pdf_files = sorted(pdf_dir.glob("**/*.pdf"))
+    if not pdf_files:
+        logger.warning("No PDFs found in %s", pdf_dir)
+
+    manifest = load_manifest()
+    params = chunking_params()
+    if ensure_embedding_metadata():
+        parent_store.delete([p for entry in manifest.get("files", {}).values() for p in entry.get("parent_ids", [])])
+    # A manifest that does not match the collection (e.g. a wiped .chromadb) is ignored.
+    previous = manifest.get("files", {}) if get_collection().count() > 0 else {}
+    if not previous:
+        lexical_index.remove(list(lexical_index.docs))
+
+    files = {}
+    hashes = {}
+    skipped = 0
+    for pdf_path in pdf_files:
+        source = source_key(pdf_path)
+        content_hash = file_hash(pdf_path)
+        entry = previous.get(source)
+        if not full and entry and entry["hash"] == content_hash and entry["params"] == params:
+            files[source] = entry
+            skipped += 1
+        else:
+            hashes[pdf_path] = content_hash
+
+    failed = 0
+    for pdf_path, prepared, error in extract_in_background(list(hashes)):
+        source = source_key(pdf_path)
+        entry = previous.get(source)
+        if error is not None:
+            # Keep whatever was indexed before so the file is neither lost nor pruned.
+            logger.error("Failed to extract %s: %s", pdf_path.name, error)
+            if entry:
+                files[source] = entry
+            failed += 1
+            continue
+
+        ids, parent_ids = write_prepared(
+            prepared, hashes[pdf_path],
+            entry["chunk_ids"] if entry else (), entry.get("parent_ids", []) if entry else ()
+        )
+        files[source] = {"hash": hashes[pdf_path], "params": params, "chunk_ids": ids, "parent_ids": parent_ids}
+        save_manifest({"files": {**previous, **files}})
+
+    removed = [source for source in previous if source not in files]
+    for source in removed:
+        logger.info("Pruning removed file: %s", source)
+        delete_ids(previous[source]["chunk_ids"])
+        parent_store.delete(previous[source].get("parent_ids", []))
+
+    backfill_lexical_index(files)
+    lexical_index.save(LEXICAL_INDEX_PATH)
+    export_collection()
+    save_manifest({"files": files})
+    updated = len(hashes) - failed
+    logger.info("Ingestion complete. %d updated, %d unchanged, %d removed, %d failed.", updated, skipped, len(removed), failed)
 
-if not pdf_files:
-    print("No PDFs found! Please check the PDF folder path.")
-else:
-    for file in pdf_files:
-        process_pdf(file)
 
-print("Ingestion complete.")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest PDFs into the immigration_docs collection.")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and re-ingest every file")
+    args = parser.parse_args()
+    logging.basicConfig(level=LOG_LEVEL, format="%(message)s")
+    ingest(full=args.full)
@@ -0,0 +1,127 @@
+from collections import Counter
+from pathlib import Path
+import heapq
+import json
+import math
+import os
+import re
+
+# Lexical (BM25) index over the same chunks ingest.py writes to Chroma. Dense
+# retrieval tends to miss exact terms such as form numbers ("I-765"), "CPT" or
+# "STEM OPT"; BM25 catches them and is fused with the vector ranking in query.py.
+
+TOKEN_RE = re.compile(r"[^\W_]+(?:[-/][^\W_]+)*")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from", "how", "i", "if",
+    "in", "is", "it", "me", "my", "of", "on", "or", "the", "to", "was", "what", "when", "where",
+    "which", "who", "will", "with", "you", "your",
+}
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if "-" in token or "/" in token:
+            # Index "i-765" both as written and as "i765" so either spelling matches.
+            tokens.append(token)
+            tokens.append(re.sub(r"[-/]", "", token))
+        elif token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    Incrementally updatable BM25 index. Only the per-document term frequencies
+    are persisted; postings and statistics are rebuilt in memory on load.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs = {}  # id -> {"terms": {term: tf}, "length": int, "meta": dict}
+        self.postings = {}  # term -> {id: tf}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.docs
+
+    def add(self, ids, documents, metadatas=None):
+        metadatas = metadatas or [{}] * len(ids)
+        for doc_id, document, meta in zip(ids, documents, metadatas):
+            self.remove([doc_id])
+            terms = Counter(tokenize(document))
+            self._insert(doc_id, {"terms": dict(terms), "length": sum(terms.values()), "meta": meta})
+
+    def _insert(self, doc_id, doc):
+        self.docs[doc_id] = doc
+        self.total_length += doc["length"]
+        for term, tf in doc["terms"].items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, ids):
+        for doc_id in ids:
+            doc = self.docs.pop(doc_id, None)
+            if doc is None:
+                continue
+            self.total_length -= doc["length"]
+            for term in doc["terms"]:
+                posting = self.postings[term]
+                del posting[doc_id]
+                if not posting:
+                    del self.postings[term]
+
+    def search(self, query, k=10, accept=None):
+        """
+        Returns up to k (id, score) pairs ordered by BM25 score. `accept` is an
+        optional predicate over a document's metadata used to restrict results.
+        """
+        if not self.docs:
+            return []
+        n_docs = len(self.docs)
+        avg_length = self.total_length / n_docs or 1
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                length = self.docs[doc_id]["length"]
+                norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        if accept is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if accept(self.docs[doc_id]["meta"])}
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "k1": self.k1, "b": self.b, "docs": self.docs}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        with open(path, "r") as f:
+            data = json.load(f)
+        index = cls(k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+        for doc_id, doc in data["docs"].items():
+            index._insert(doc_id, doc)
+        return index
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuses several ranked id lists: score(d) = sum over lists of 1 / (k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
@@ -0,0 +1,201 @@
+from contextlib import contextmanager
+import bisect
+import contextvars
+import threading
+import time
+
+# Request metrics in the Prometheus text format, served on /metrics by both
+# apps. Counters and histograms are kept in-process; cache statistics are read
+# from the caches' own counters when /metrics is scraped, so the hot path only
+# pays for the timing spans.
+#
+# span("embed") times one stage of a request. Besides feeding the stage
+# histogram, the duration is recorded on the current request (a contextvar set
+# by start_request) so it can be returned in a Server-Timing header.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(n, "") for n in self.labelnames), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        names = self.labelnames + ("le",)
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, key + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+# 1. Registry
+_metrics = []
+_collectors = []
+
+def counter(name, documentation, labelnames=()):
+    metric = Counter(name, documentation, labelnames)
+    _metrics.append(metric)
+    return metric
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    metric = Histogram(name, documentation, labelnames, buckets)
+    _metrics.append(metric)
+    return metric
+
+def register_collector(collect):
+    """collect() returns a list of (name, type, documentation, labelnames, {label values: value}) families."""
+    _collectors.append(collect)
+
+def register_cache(name, cache):
+    """Exports a cache's stats() (hits, misses, size, ...) under cache="<name>"."""
+    def collect():
+        stats = cache.stats()
+        families = [
+            ("machuni_cache_hits_total", "counter", "Cache lookups that found a usable entry.", stats.get("hits")),
+            ("machuni_cache_misses_total", "counter", "Cache lookups that found nothing usable.", stats.get("misses")),
+            ("machuni_cache_entries", "gauge", "Entries currently held by the cache.", stats.get("size")),
+            ("machuni_cache_stale_hits_total", "counter", "Hits served stale while a refresh ran.", stats.get("stale_hits")),
+        ]
+        return [(family, kind, doc, ("cache",), {(name,): value}) for family, kind, doc, value in families if value is not None]
+    register_collector(collect)
+
+def render():
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+
+    # Collector output is merged by family so each HELP/TYPE line appears once.
+    families = {}
+    for collect in _collectors:
+        try:
+            for name, kind, documentation, labelnames, samples in collect():
+                families.setdefault(name, (kind, documentation, labelnames, {}))[3].update(samples)
+        except Exception:
+            continue
+    for name, (kind, documentation, labelnames, samples) in families.items():
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+        lines += [f"{name}{_labels(labelnames, key)} {_number(value)}" for key, value in sorted(samples.items())]
+    return "\n".join(lines) + "\n"
+
+
+# 2. Metrics
+REQUEST_SECONDS = histogram("machuni_request_duration_seconds", "Time to produce a response, by endpoint.", ["endpoint"])
+REQUESTS = counter("machuni_requests_total", "Responses sent, by endpoint and HTTP status.", ["endpoint", "status"])
+STAGE_SECONDS = histogram("machuni_stage_duration_seconds", "Time spent in each request stage.", ["stage"])
+UPSTREAM_SECONDS = histogram("machuni_upstream_duration_seconds", "Ollama call latency, by operation.", ["operation"])
+UPSTREAM_ERRORS = counter("machuni_upstream_errors_total", "Failed Ollama calls, by operation.", ["operation"])
+
+
+# 3. Spans
+_timings = contextvars.ContextVar("request_timings", default=None)
+
+def start_request():
+    """Starts collecting span timings for the current request; returns the list they go into."""
+    timings = []
+    _timings.set(timings)
+    return timings
+
+def record(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+@contextmanager
+def upstream(operation):
+    """Times one Ollama call and counts it as an upstream error if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        # Cancellation and closed streams are not upstream failures.
+        UPSTREAM_ERRORS.inc(operation=operation)
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, operation=operation)
+
+def finish_request(endpoint, status, seconds):
+    REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+    REQUESTS.inc(endpoint=endpoint, status=status)
+
+def server_timing(timings, total=None):
+    """Formats span timings as a Server-Timing header value (durations in ms)."""
+    merged = {}
+    for stage, seconds in timings:
+        merged[stage] = merged.get(stage, 0.0) + seconds
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in merged.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,229 @@
+from pathlib import Path
+import hashlib
+import io
+import logging
+import os
+import re
+import struct
+import tempfile
+import threading
+from cache import TTLCache
+from faq_store import language_code
+import metrics
+from config import (
+    MULTILINGUAL_ENABLED, CANONICAL_LANGUAGE, TRANSLATOR, TTS_BACKEND, TTS_VOICE,
+    MULTILINGUAL_CACHE_PATH, TRANSLATION_CACHE_SIZE, AUDIO_CHUNK_SIZE
+)
+
+# Multilingual answers. Instead of asking the LLM to answer in the user's
+# language, every answer is generated once in CANONICAL_LANGUAGE (and cached
+# under that language by the semantic answer cache), then translated, and
+# optionally spoken, per language:
+#
+#   answer --sha256--> answer id
+#   (answer id, language)         -> translated text
+#   (answer id, language, voice)  -> audio file
+#
+# Results live in a content-addressed store on disk (plus an in-memory LRU for
+# text), so a repeat question in another language costs a cache lookup and one
+# translation at most, never another generation. Translator and TTS backends
+# are pluggable; "stub" versions work offline for local development.
+
+logger = logging.getLogger(__name__)
+
+VOICE_RE = re.compile(r"^[a-z]{2,3}(\.[a-z]{2,3})?$")
+
+
+def answer_id(answer):
+    return hashlib.sha256(answer.encode("utf-8")).hexdigest()
+
+def generation_language(language):
+    """The language the LLM is asked to answer in."""
+    return CANONICAL_LANGUAGE if MULTILINGUAL_ENABLED else language
+
+def needs_translation(language):
+    return MULTILINGUAL_ENABLED and language_code(language) != language_code(CANONICAL_LANGUAGE)
+
+
+# 1. Translators
+class StubTranslator:
+    """Returns the text unchanged; for local development without network access."""
+    name = "stub"
+
+    def translate(self, text, source, target):
+        return text
+
+class GoogleTranslator:
+    name = "googletrans"
+
+    def __init__(self):
+        self._translator = None
+        self._lock = threading.Lock()
+
+    def translate(self, text, source, target):
+        from googletrans import Translator
+        # googletrans keeps per-client state, so calls are serialized.
+        with self._lock:
+            if self._translator is None:
+                self._translator = Translator()
+            return self._translator.translate(text, src=source, dest=target).text
+
+TRANSLATORS = {"stub": StubTranslator, "googletrans": GoogleTranslator}
+
+
+# 2. Text-to-speech
+class StubTTS:
+    """Silent 16 kHz mono WAV, about 60 ms per word; for local development."""
+    name = "stub"
+    media_type = "audio/wav"
+    suffix = ".wav"
+
+    def synthesize(self, text, code, voice):
+        samples = 16000 * 60 // 1000 * max(1, len(text.split()))
+        data_size = samples * 2
+        yield b"RIFF" + struct.pack("<I", 36 + data_size) + b"WAVE"
+        yield b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, 16000, 32000, 2, 16)
+        yield b"data" + struct.pack("<I", data_size)
+        for start in range(0, data_size, AUDIO_CHUNK_SIZE):
+            yield bytes(min(AUDIO_CHUNK_SIZE, data_size - start))
+
+class GttsTTS:
+    """Google Translate's TTS through gTTS; MP3 is yielded as each sentence comes back."""
+    name = "gtts"
+    media_type = "audio/mpeg"
+    suffix = ".mp3"
+
+    def synthesize(self, text, code, voice):
+        from gtts import gTTS
+        speech = gTTS(text, lang=code, tld=voice or "com")
+        if hasattr(speech, "stream"):
+            yield from speech.stream()
+        else:
+            buffer = io.BytesIO()
+            speech.write_to_fp(buffer)
+            yield buffer.getvalue()
+
+TTS_BACKENDS = {"stub": StubTTS, "gtts": GttsTTS}
+
+
+# 3. Content-addressed store
+class ContentStore:
+    """Files named by the sha256 of their key, fanned out over 256 directories."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+
+    def file(self, key, suffix):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.path / digest[:2] / f"{digest}{suffix}"
+
+    def get_text(self, key):
+        try:
+            text = self.file(key, ".txt").read_text(encoding="utf-8")
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text
+
+    def put_text(self, key, text):
+        for _ in self.put_chunks(key, ".txt", [text.encode("utf-8")]):
+            pass
+
+    def put_chunks(self, key, suffix, chunks):
+        """Writes chunks to a temporary file and publishes it atomically; yields each chunk on the way."""
+        target = self.file(key, suffix)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def read_chunks(self, key, suffix, chunk_size=AUDIO_CHUNK_SIZE):
+        """The stored file in chunks, or None if it is not cached."""
+        target = self.file(key, suffix)
+        if not target.exists():
+            self.misses += 1
+            return None
+        self.hits += 1
+
+        def chunks():
+            with open(target, "rb") as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+        return chunks()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+translator = TRANSLATORS[TRANSLATOR]()
+tts = TTS_BACKENDS[TTS_BACKEND]() if TTS_BACKEND != "none" else None
+store = ContentStore(MULTILINGUAL_CACHE_PATH)
+translation_cache = TTLCache(maxsize=TRANSLATION_CACHE_SIZE)
+metrics.register_cache("translation", translation_cache)
+metrics.register_cache("multilingual_store", store)
+
+
+# 4. Pipeline
+def remember(answer):
+    """Stores a canonical answer under its id (so audio can be requested later); returns the id."""
+    key = answer_id(answer)
+    if not store.file(f"answer:{key}", ".txt").exists():
+        store.put_text(f"answer:{key}", answer)
+    return key
+
+def localize(answer, language):
+    """The canonical answer in `language`. Falls back to the canonical text if translation fails."""
+    if not needs_translation(language):
+        return answer
+    code = language_code(language)
+    key = f"translation:{answer_id(answer)}:{code}:{translator.name}"
+    text = translation_cache.get(key)
+    if text is None:
+        text = store.get_text(key)
+        if text is None:
+            try:
+                with metrics.span("translate"):
+                    text = translator.translate(answer, language_code(CANONICAL_LANGUAGE), code)
+            except Exception as e:
+                logger.warning("Translation to %s failed, answering in %s: %s", code, CANONICAL_LANGUAGE, e)
+                return answer
+            store.put_text(key, text)
+        translation_cache.set(key, text)
+    return text
+
+def reply(answer, language):
+    """(answer in `language`, answer id) for a canonical answer."""
+    return localize(answer, language), remember(answer)
+
+def speech(answer_key, language, voice=None):
+    """
+    (media type, chunk iterator) for the spoken answer, or None when TTS is off
+    or the answer id is unknown. Audio is cached per (answer, language, voice);
+    on a miss it is streamed to the caller while being written to the store.
+    """
+    voice = voice if voice and VOICE_RE.match(voice) else TTS_VOICE
+    if tts is None or not re.fullmatch(r"[0-9a-f]{64}", answer_key or ""):
+        return None
+    code = language_code(language)
+    key = f"audio:{answer_key}:{code}:{voice}:{tts.name}"
+    cached = store.read_chunks(key, tts.suffix)
+    if cached is not None:
+        return tts.media_type, cached
+    answer = store.get_text(f"answer:{answer_key}")
+    if answer is None:
+        return None
+    text = re.sub(r"<[^>]+>", " ", localize(answer, language))
+    return tts.media_type, store.put_chunks(key, tts.suffix, tts.synthesize(text, code, voice))
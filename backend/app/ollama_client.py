@@ -0,0 +1,189 @@
+import json
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import upstream
+from scheduler import GenerationScheduler, register_metrics
+from config import (
+    OLLAMA_URL, EMBED_MODEL, CHAT_MODEL,
+    OLLAMA_POOL_SIZE, OLLAMA_KEEPALIVE_CONNECTIONS, OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT,
+    OLLAMA_CHAT_URLS, GENERATION_CONCURRENCY, GENERATION_MAX_QUEUE, GENERATION_TIMEOUT,
+    GENERATION_MAX_WAIT_CHAT, GENERATION_MAX_WAIT_QUERIES, GENERATION_MAX_WAIT_WARMUP, OLLAMA_KEEP_ALIVE
+)
+
+# Shared upstream clients for Ollama. Every embed and chat call goes through one
+# keep-alive connection pool per process: a requests.Session for the Flask app
+# and CLI scripts, an httpx.AsyncClient for the ASGI app. Every call is timed
+# and failures are counted per operation (see metrics.upstream).
+#
+# Chat generations are admitted through the generation scheduler, which caps
+# concurrent generations per endpoint and model and picks the endpoint. The
+# `priority` argument names the request class: "chat" (interactive) is served
+# before "queries" (starter questions) and "warmup" (background refreshes).
+# When no slot frees up in time, scheduler.GenerationBusy is raised.
+#
+# Both clients are created on first use. With OLLAMA_KEEP_ALIVE set, every
+# request asks Ollama to keep its model loaded that long (-1 = forever), so the
+# models the startup warm-up loaded stay pinned in memory.
+
+_session = None
+_session_lock = threading.Lock()
+_async_client = None
+_async_client_lock = threading.Lock()
+
+def _keep_alive():
+    if not OLLAMA_KEEP_ALIVE:
+        return {}
+    try:
+        return {"keep_alive": int(OLLAMA_KEEP_ALIVE)}
+    except ValueError:
+        return {"keep_alive": OLLAMA_KEEP_ALIVE}
+
+generation_scheduler = GenerationScheduler(
+    OLLAMA_CHAT_URLS,
+    concurrency=GENERATION_CONCURRENCY,
+    max_queue=GENERATION_MAX_QUEUE,
+    classes={
+        "chat": (0, GENERATION_MAX_WAIT_CHAT),
+        "queries": (1, GENERATION_MAX_WAIT_QUERIES),
+        "warmup": (2, GENERATION_MAX_WAIT_WARMUP),
+    }
+)
+register_metrics(generation_scheduler)
+
+
+# 1. Sync client
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=OLLAMA_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+def _timeout(read=OLLAMA_READ_TIMEOUT):
+    return (OLLAMA_CONNECT_TIMEOUT, read)
+
+def embed(texts, model=EMBED_MODEL):
+    with upstream("embed"):
+        response = get_session().post(
+            f"{OLLAMA_URL}/api/embed",
+            json={"model": model, "input": texts, **_keep_alive()},
+            timeout=_timeout()
+        )
+        response.raise_for_status()
+        return response.json()["embeddings"]
+
+def running_models(base_url=OLLAMA_URL, timeout=2.0):
+    """Names of the models Ollama currently holds in memory (/api/ps)."""
+    response = get_session().get(f"{base_url}/api/ps", timeout=(OLLAMA_CONNECT_TIMEOUT, timeout))
+    response.raise_for_status()
+    return [model["name"] for model in response.json().get("models", [])]
+
+def chat(messages, model=CHAT_MODEL, priority="chat", **extra):
+    with generation_scheduler.slot(model, priority) as base_url, upstream("chat"):
+        response = get_session().post(
+            f"{base_url}/api/chat",
+            json={"model": model, "stream": False, "messages": messages, **_keep_alive(), **extra},
+            timeout=_timeout(GENERATION_TIMEOUT)
+        )
+        response.raise_for_status()
+        return response.json()["message"]["content"]
+
+def _token(line):
+    chunk = json.loads(line)
+    if "error" in chunk:
+        raise RuntimeError(chunk["error"])
+    return chunk.get("message", {}).get("content", ""), chunk.get("done", False)
+
+def stream_chat(messages, model=CHAT_MODEL, priority="chat", **extra):
+    """
+    Yields tokens from Ollama's NDJSON chat stream. Closing the generator closes
+    the upstream connection, which makes Ollama stop generating.
+    """
+    # The slot is held until the stream finishes or the generator is closed.
+    with generation_scheduler.slot(model, priority) as base_url, upstream("chat_stream"):
+        response = get_session().post(
+            f"{base_url}/api/chat",
+            json={"model": model, "stream": True, "messages": messages, **_keep_alive(), **extra},
+            timeout=_timeout(GENERATION_TIMEOUT),
+            stream=True
+        )
+        try:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                token, done = _token(line)
+                if token:
+                    yield token
+                if done:
+                    break
+        finally:
+            response.close()
+
+
+# 2. Async client
+def get_async_client():
+    # httpx is only needed by the ASGI app, so it is imported lazily.
+    global _async_client
+    if _async_client is None:
+        import httpx
+        with _async_client_lock:
+            if _async_client is None:
+                _async_client = httpx.AsyncClient(
+                    base_url=OLLAMA_URL,
+                    limits=httpx.Limits(
+                        max_connections=OLLAMA_POOL_SIZE,
+                        max_keepalive_connections=OLLAMA_KEEPALIVE_CONNECTIONS
+                    ),
+                    timeout=httpx.Timeout(OLLAMA_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT)
+                )
+    return _async_client
+
+async def aclose():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+async def aembed(texts, model=EMBED_MODEL):
+    with upstream("embed"):
+        response = await get_async_client().post("/api/embed", json={"model": model, "input": texts, **_keep_alive()})
+        response.raise_for_status()
+        return response.json()["embeddings"]
+
+async def achat(messages, model=CHAT_MODEL, priority="chat", **extra):
+    async with generation_scheduler.aslot(model, priority) as base_url:
+        with upstream("chat"):
+            response = await get_async_client().post(
+                f"{base_url}/api/chat",
+                json={"model": model, "stream": False, "messages": messages, **_keep_alive(), **extra},
+                timeout=GENERATION_TIMEOUT
+            )
+            response.raise_for_status()
+            return response.json()["message"]["content"]
+
+async def astream_chat(messages, model=CHAT_MODEL, priority="chat", **extra):
+    # The span covers connecting as well, so refused connections and 5xx count as errors.
+    async with generation_scheduler.aslot(model, priority) as base_url:
+        with upstream("chat_stream"):
+            async with get_async_client().stream(
+                "POST",
+                f"{base_url}/api/chat",
+                json={"model": model, "stream": True, "messages": messages, **_keep_alive(), **extra},
+                timeout=GENERATION_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    token, done = _token(line)
+                    if token:
+                        yield token
+                    if done:
+                        break
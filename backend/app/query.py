@@ -1,93 +1,378 @@
-from chromadb import PersistentClient
-from chromadb.config import Settings
 from pathlib import Path
 import requests
+import httpx
+import json
+import asyncio
+import logging
+import textwrap
+import threading
+from cache import TTLCache, DiskCache
+from semantic_cache import SemanticCache
+from embed_batcher import EmbedBatcher, AsyncEmbedBatcher
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from query_router import QueryRouter
+from context_builder import build_context
+from chunking import ParentStore
+from exact_index import ExactIndex
+from reranker import Reranker, LexicalScorer, CrossEncoderScorer
+from embedding_backend import get_backend, check_collection
+import ollama_client
+import metrics
+from metrics import span
+from config import (
+    OLLAMA_URL, CHAT_MODEL, EMBED_CACHE_SIZE, EMBED_CACHE_TTL, EMBED_CACHE_PATH,
+    ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL,
+    EMBED_BATCHING_ENABLED, EMBED_BATCH_MAX_SIZE, EMBED_BATCH_WINDOW_MS, EMBED_BATCH_MAX_IN_FLIGHT,
+    RETRIEVAL_MODE, LEXICAL_INDEX_PATH, HYBRID_CANDIDATES, RRF_K, ROUTING_ENABLED, CHROMA_PATH,
+    RETRIEVAL_ENGINE, EXACT_INDEX_PATH,
+    CONTEXT_TOKEN_BUDGET, CONTEXT_SCORER, ANSWER_TEMPERATURE, ANSWER_CACHE_FALLBACK_THRESHOLD,
+    RERANK_ENABLED, RERANKER, RERANK_MODEL, RERANK_DEVICE, RERANK_CANDIDATES, RERANK_BATCH_SIZE,
+    RERANK_BUDGET_MS, RERANK_CACHE_SIZE, RERANK_CACHE_TTL
+)
 import os
 os.environ["CHROMA_TELEMETRY_DISABLED"] = "1"
 
+logger = logging.getLogger(__name__)
+
+
+# 1. Setup the vector search engine
+# Both engines return (id, document, metadata) hits. "chroma" queries the HNSW
+# collection; "exact" scans the memory-mapped matrix ingest.py exports. The
+# engine is opened on first use, so importing this module never touches the
+# index; readiness.py opens it during the startup warm-up.
+persist_path = Path(CHROMA_PATH)
+
+class ChromaEngine:
+    def __init__(self, collection):
+        self.collection = collection
+        self.metadata = collection.metadata
+
+    def __len__(self):
+        return self.collection.count()
+
+    def refresh(self):
+        return self
+
+    def query(self, embedding, n_results, where=None):
+        results = self.collection.query(
+            query_embeddings=[embedding],
+            n_results=n_results,
+            where=where
+        )
+        return list(zip(results['ids'][0], results['documents'][0], results['metadatas'][0]))
+
+    def get(self, ids):
+        fetched = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        return list(zip(fetched['ids'], fetched['documents'], fetched['metadatas']))
 
-# 1. Setup ChromaDB client
-base_path = Path(__file__).resolve().parent.parent
-persist_path = base_path / ".chromadb"
+def open_vector_engine():
+    if RETRIEVAL_ENGINE == "exact":
+        return ExactIndex(EXACT_INDEX_PATH)
+    from chromadb import PersistentClient
+    from chromadb.config import Settings
 
-chroma_client = PersistentClient(
-    path=str(persist_path),
-    settings=Settings(anonymized_telemetry=False)
+    chroma_client = PersistentClient(
+        path=str(persist_path),
+        settings=Settings(anonymized_telemetry=False)
+    )
+    return ChromaEngine(chroma_client.get_collection(name="immigration_docs"))
+
+embedder = get_backend()
+_vector_engine = None
+_vector_engine_lock = threading.Lock()
+_checked_metadata = None
+
+def get_vector_engine():
+    """The vector engine, opened once per process. Raises (and retries on the next call) until the index exists."""
+    global _vector_engine, _checked_metadata
+    if _vector_engine is None:
+        with _vector_engine_lock:
+            if _vector_engine is None:
+                _vector_engine = open_vector_engine()
+    engine = _vector_engine.refresh()
+    if engine.metadata != _checked_metadata:
+        # Query vectors must come from the model the index was built with; checked
+        # again whenever a reloaded exact index brings new metadata.
+        check_collection(engine.metadata, embedder)
+        _checked_metadata = engine.metadata
+    return engine
+# Parent passages of small-to-big chunks (see chunking.py); empty when ingest did not write any.
+parent_store = ParentStore(persist_path / "parents.sqlite")
+
+# 2. Embedding function with a query-embedding cache
+# Starter and preset questions repeat constantly, so their embeddings are kept in
+# an in-process LRU (and optionally on disk) keyed on normalized text + model.
+# Vectors come from the configured backend (Ollama or in-process, see
+# embedding_backend.py); other models are only available through Ollama.
+embedding_cache = TTLCache(maxsize=EMBED_CACHE_SIZE, ttl=EMBED_CACHE_TTL)
+embedding_disk_cache = DiskCache(EMBED_CACHE_PATH, ttl=EMBED_CACHE_TTL) if EMBED_CACHE_PATH else None
+
+def embedding_cache_key(text, model):
+    return f"{model}:{' '.join(text.lower().split())}"
+
+def _cached_embeddings(texts, model):
+    vectors = [None] * len(texts)
+    missing = []
+    for i, text in enumerate(texts):
+        key = embedding_cache_key(text, model)
+        vector = embedding_cache.get(key)
+        if vector is None and embedding_disk_cache is not None:
+            vector = embedding_disk_cache.get(key)
+            if vector is not None:
+                embedding_cache.set(key, vector)
+        if vector is None:
+            missing.append(i)
+        vectors[i] = vector
+    return vectors, missing
+
+def _fill_embeddings(texts, model, vectors, missing, embedded):
+    for i, vector in zip(missing, embedded):
+        key = embedding_cache_key(texts[i], model)
+        embedding_cache.set(key, vector)
+        if embedding_disk_cache is not None:
+            embedding_disk_cache.set(key, vector)
+        vectors[i] = vector
+    return vectors
+
+# Concurrent cache misses for the backend's model are coalesced into batched
+# embedding calls, with identical in-flight texts sharing one request.
+embed_batcher = EmbedBatcher(
+    embedder.embed,
+    max_batch_size=EMBED_BATCH_MAX_SIZE,
+    window=EMBED_BATCH_WINDOW_MS / 1000,
+    max_in_flight=EMBED_BATCH_MAX_IN_FLIGHT
+)
+async_embed_batcher = AsyncEmbedBatcher(
+    embedder.aembed,
+    max_batch_size=EMBED_BATCH_MAX_SIZE,
+    window=EMBED_BATCH_WINDOW_MS / 1000
 )
 
-collection = chroma_client.get_collection(name="immigration_docs")
+metrics.register_cache("embedding", embedding_cache)
+if embedding_disk_cache is not None:
+    metrics.register_cache("embedding_disk", embedding_disk_cache)
+metrics.register_collector(lambda: [
+    (f"machuni_embed_{stat}_total", "counter", doc, ("batcher",),
+     {("thread",): embed_batcher.stats()[stat], ("async",): async_embed_batcher.stats()[stat]})
+    for stat, doc in (
+        ("batches", "Batched embedding calls issued by the embedding batcher."),
+        ("batched_texts", "Texts sent in batched embedding calls."),
+        ("deduplicated", "Embedding requests served by an identical in-flight request."),
+    )
+])
+
+def embed_texts(texts, model=None):
+    model = model or embedder.model
+    with span("embed"):
+        vectors, missing = _cached_embeddings(texts, model)
+        if missing:
+            try:
+                if model != embedder.model:
+                    embedded = ollama_client.embed([texts[i] for i in missing], model)
+                elif EMBED_BATCHING_ENABLED:
+                    embedded = embed_batcher.embed_many([texts[i] for i in missing])
+                else:
+                    embedded = embedder.embed([texts[i] for i in missing])
+            except requests.exceptions.HTTPError as e:
+                logger.error("Embedding request failed: %s (%s)", e, e.response.text[:200])
+                raise
+            _fill_embeddings(texts, model, vectors, missing, embedded)
+        return vectors
+
+async def aembed_texts(texts, model=None):
+    model = model or embedder.model
+    with span("embed"):
+        vectors, missing = _cached_embeddings(texts, model)
+        if missing:
+            if model != embedder.model:
+                embedded = await ollama_client.aembed([texts[i] for i in missing], model)
+            elif EMBED_BATCHING_ENABLED:
+                embedded = await async_embed_batcher.embed_many([texts[i] for i in missing])
+            else:
+                embedded = await embedder.aembed([texts[i] for i in missing])
+            _fill_embeddings(texts, model, vectors, missing, embedded)
+        return vectors
+
+def embed_uncached(texts):
+    """
+    Vectors straight from the backend (through the batcher), for one-off texts
+    such as context sentences that would only push questions out of the cache.
+    """
+    if EMBED_BATCHING_ENABLED:
+        return embed_batcher.embed_many(texts)
+    return embedder.embed(texts)
 
-# 2. Ollama Embedding Function 
 def ollama_embed(text):
     if isinstance(text, str):
-        text = [text]  
+        text = [text]
 
-    response = requests.post(
-        "http://localhost:11434/api/embed",
-        json={
-            "model": "nomic-embed-text",
-            "input": text
-        }
-    )
-    try:
-        response.raise_for_status()
-    except requests.exceptions.HTTPError as e:
-        print(" HTTP Error:", e)
-        print(" Response JSON:", response.json())
-        raise
+    return embed_texts(text)[0]
 
-    print(" Ollama Response JSON:", response.json())  
+async def aollama_embed(text):
+    if isinstance(text, str):
+        text = [text]
 
-    return response.json()["embeddings"][0]
+    return (await aembed_texts(text))[0]
 
 # 3. Ask question and retrieve top chunks
-def ask_question(question, n_results=3):
-    embedding = ollama_embed(question)
+# The BM25 index is written by ingest.py; reload it whenever the file changes.
+_lexical_index = LexicalIndex()
+_lexical_index_mtime = None
+
+def get_lexical_index():
+    global _lexical_index, _lexical_index_mtime
+    try:
+        mtime = os.path.getmtime(LEXICAL_INDEX_PATH)
+    except OSError:
+        return _lexical_index
+    if mtime != _lexical_index_mtime:
+        _lexical_index = LexicalIndex.load(LEXICAL_INDEX_PATH)
+        _lexical_index_mtime = mtime
+    return _lexical_index
+
+def vector_search(embedding, n_results, where=None):
+    with span("vector"):
+        return get_vector_engine().query(embedding, n_results, where)
+
+def hybrid_search(question, embedding, n_results, route=None):
+    """
+    Fuses the dense ranking from Chroma with the BM25 ranking using reciprocal
+    rank fusion, then returns the top n_results (id, document, metadata) hits.
+    """
+    n_candidates = max(n_results, HYBRID_CANDIDATES)
+    dense = vector_search(embedding, n_candidates, route.where() if route else None)
+    with span("bm25"):
+        lexical = get_lexical_index().search(question, n_candidates, route.accepts if route else None)
+    fused = reciprocal_rank_fusion([[hit[0] for hit in dense], [doc_id for doc_id, _ in lexical]], k=RRF_K)[:n_results]
+
+    hits = {hit[0]: hit for hit in dense}
+    missing = [doc_id for doc_id in fused if doc_id not in hits]
+    if missing:
+        with span("vector"):
+            for hit in get_vector_engine().get(missing):
+                hits[hit[0]] = hit
+    return [hits[doc_id] for doc_id in fused if doc_id in hits]
+
+def search(question, embedding, n_results, route=None):
+    if RETRIEVAL_MODE == "hybrid" and len(get_lexical_index()) > 0:
+        return hybrid_search(question, embedding, n_results, route)
+    return vector_search(embedding, n_results, route.where() if route else None)
+
+query_router = QueryRouter()
+
+def retrieve(question, embedding, n_results=3, n_candidates=None):
+    # Search only the predicted topic/language first; fall back to the whole
+    # collection when the router is not confident or the filter is too narrow.
+    n_candidates = max(n_results, n_candidates or n_results)
+    with span("route"):
+        route = query_router.route(question, embedding) if ROUTING_ENABLED else None
+    if route is not None and route.where() is not None:
+        hits = search(question, embedding, n_candidates, route)
+        if len(hits) >= n_results:
+            return hits
+    return search(question, embedding, n_candidates)
+
+reranker = Reranker(
+    CrossEncoderScorer(RERANK_MODEL, RERANK_DEVICE) if RERANKER == "cross-encoder" else LexicalScorer(),
+    batch_size=RERANK_BATCH_SIZE,
+    budget_ms=RERANK_BUDGET_MS,
+    cache_size=RERANK_CACHE_SIZE,
+    cache_ttl=RERANK_CACHE_TTL
+)
+metrics.register_cache("rerank", reranker.cache)
+metrics.register_collector(lambda: [
+    ("machuni_rerank_over_budget_total", "counter", "Rerankings cut short by the latency budget.", (), {(): reranker.over_budget})
+])
+
+def expand_to_parents(hits):
+    """
+    Small-to-big retrieval: replaces each matched child chunk with its parent
+    passage (once per parent, in hit order). Hits without a parent are kept as is.
+    """
+    parent_ids = [meta.get("parent_id") for _, _, meta in hits]
+    parents = parent_store.get([p for p in set(parent_ids) if p])
+    documents, seen = [], set()
+    for (_, document, _), parent in zip(hits, parent_ids):
+        if parent in parents:
+            if parent in seen:
+                continue
+            seen.add(parent)
+            document = parents[parent]
+        documents.append(document)
+    return documents
+
+def ask_question(question, n_results=3, embedding=None):
+    if embedding is None:
+        embedding = ollama_embed(question)
     if isinstance(embedding[0], list):
         embedding = embedding[0]
 
-    results = collection.query(
-        query_embeddings=[embedding],
-        n_results=n_results
-    )
+    if RERANK_ENABLED:
+        # Retrieve a wide pool for recall, then keep only the best few for the prompt.
+        hits = retrieve(question, embedding, n_results, RERANK_CANDIDATES)
+        with span("rerank"):
+            hits = reranker.rerank(question, hits, n_results)
+    else:
+        hits = retrieve(question, embedding, n_results)
+    documents = expand_to_parents(hits)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Top matching chunks: %s", ", ".join(
+            f"{meta['source']} p.{meta.get('page_start', '?')}" for _, _, meta in hits
+        ))
+
+    # Only the sentences most relevant to the question are sent to the LLM (see context_builder.py).
+    with span("context"):
+        return build_context(
+            question, documents, CONTEXT_TOKEN_BUDGET,
+            embedding=embedding if CONTEXT_SCORER == "embedding" else None,
+            embed=embed_uncached
+        )
 
-    documents = results['documents'][0]
-    sources = results['metadatas'][0]
 
-    context_text = "\n".join([f"[{i+1}] From {sources[i]['source']}:\n{doc}" for i, doc in enumerate(documents)])
-    print("\n🔎 Top Matching Chunks:\n")
-    print(context_text)
+# Generated answers keyed by question embedding + user profile (see /chat).
+answer_cache = SemanticCache(threshold=ANSWER_CACHE_THRESHOLD, maxsize=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL)
+metrics.register_cache("answer", answer_cache)
 
-    return "\n".join(documents)  # This is used to have LLM answers instead of source paragraphs
+SERVICE_ERROR_ANSWER = "<p>Sorry, I am having trouble connecting to the service.</p>"
+BUSY_ANSWER = "<p>Sorry, the assistant is busy right now. Please try again in a moment.</p>"
 
+def answer_cache_key(status, language, country, state):
+    return tuple(" ".join(str(value).lower().split()) for value in (status, language, country, state))
 
-def generate_answer_with_context(question, context, language="English", filters=None):
+def busy_fallback(embedding, cache_key):
     """
-    Generates a response using a structured system prompt and a chat-based model endpoint.
-    The response is formatted as an HTML fragment.
+    When no generation slot is free (scheduler.GenerationBusy), the best cached
+    answer to a reasonably similar question, or None.
     """
+    return answer_cache.lookup(embedding, cache_key, threshold=ANSWER_CACHE_FALLBACK_THRESHOLD)
 
-    system_prompt = """
+
+# Static system prompts. They are module constants so every request sends a
+# byte-identical prefix, which lets Ollama reuse its cached prompt evaluation;
+# everything request-specific goes in the user message.
+ANSWER_SYSTEM_PROMPT = textwrap.dedent("""
     [PERSONA]
     You are an expert AI assistant named 'Sahayogi', designed to help Nepali migrant workers. Your purpose is to provide safe, accurate, and helpful information based ONLY on the verified documents provided to you. You are supportive, clear, and professional. Your primary goal is to empower users with reliable information.
-    
-    # --- NEW SECTION START ---
-    
+
     [OUTPUT FORMATTING]
     - **Format:** Respond in plain string format without any markdown or code blocks. DO NOT include any markdown or html tags!
     - **Example response:** This is the sample response. loream ipsum dolor sit amet. loream ipsum dolor sit amet. DO NOT have any context around responding in your response.
-    
-    # --- NEW SECTION END ---
-    
+
     [CORE RULES]
     1.  **Strictly Grounded:** You MUST base your entire answer on the information found within the `<CONTEXT>` section.
     2.  **No Hallucinations:** If the answer is not in the `<CONTEXT>`, you MUST state that you cannot find the information in the provided documents, wrapped in `<p>` tags (e.g., `<p>I'm sorry, I could not find information about that.</p>`).
     3.  **Language Adherence:** You MUST respond in the language specified in the `<LANGUAGE>` filter.
-    
-    [INSTRUCTION LOGIC FLOW]
-    (The rest of the prompt remains the same...)
+""").strip()
+
+ANSWER_OPTIONS = {"temperature": ANSWER_TEMPERATURE}
+
+
+def build_answer_messages(question, context, language="English", filters=None):
+    """
+    Builds the chat messages (system prompt + user message) used to answer a
+    question from retrieved context. Shared by the blocking and streaming paths.
     """
-    # The rest of the function logic is identical to the previous version
     if filters is None:
         filters = {}
     filter_string = "\n".join([f"{key.replace('_', ' ').title()}: {value}" for key, value in filters.items()])
@@ -114,24 +399,59 @@ def generate_answer_with_context(question, context, language="English", filters=
     </CONTEXT>
     """
 
+    return [
+        {"role": "system", "content": ANSWER_SYSTEM_PROMPT},
+        {"role": "user", "content": user_message}
+    ]
+
+
+def generate_answer_with_context(question, context, language="English", filters=None):
+    """
+    Generates a response using a structured system prompt and a chat-based model endpoint.
+    The response is formatted as an HTML fragment. Raises GenerationBusy when
+    the model is saturated.
+    """
+    with span("prompt"):
+        messages = build_answer_messages(question, context, language, filters)
     try:
-        response = requests.post(
-            "http://localhost:11434/api/chat",
-            json={
-                "model": "mistral",
-                "stream": False,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                "temperature": 0.2
-            }
-        )
-        response.raise_for_status()
-        return response.json()["message"]["content"]
+        with span("llm"):
+            return ollama_client.chat(messages, options=ANSWER_OPTIONS)
     except requests.exceptions.RequestException as e:
-        print(f"An API error occurred: {e}")
-        return "<p>Sorry, I am having trouble connecting to the service.</p>"
+        logger.warning("Ollama chat request failed: %s", e)
+        return SERVICE_ERROR_ANSWER
+
+async def agenerate_answer_with_context(question, context, language="English", filters=None):
+    with span("prompt"):
+        messages = build_answer_messages(question, context, language, filters)
+    try:
+        with span("llm"):
+            return await ollama_client.achat(messages, options=ANSWER_OPTIONS)
+    except httpx.HTTPError as e:
+        logger.warning("Ollama chat request failed: %s", e)
+        return SERVICE_ERROR_ANSWER
+
+
+def stream_answer_with_context(question, context, language="English", filters=None):
+    """
+    Same as generate_answer_with_context, but yields the answer token by token
+    as Ollama produces it (NDJSON stream). Closing the generator closes the
+    upstream connection, which makes Ollama stop generating.
+    """
+    with span("prompt"):
+        messages = build_answer_messages(question, context, language, filters)
+    with span("llm"):
+        yield from ollama_client.stream_chat(messages, options=ANSWER_OPTIONS)
+
+async def astream_answer_with_context(question, context, language="English", filters=None):
+    with span("prompt"):
+        messages = build_answer_messages(question, context, language, filters)
+    tokens = ollama_client.astream_chat(messages, options=ANSWER_OPTIONS)
+    try:
+        with span("llm"):
+            async for token in tokens:
+                yield token
+    finally:
+        await tokens.aclose()
 
 # 4. Use Ollama LLM to generate answer
 def generate_answer(context, question):
@@ -145,26 +465,32 @@ def generate_answer(context, question):
 
 ### ANSWER:"""
 
-    response = requests.post(
-        "http://localhost:11434/api/generate",
+    response = ollama_client.get_session().post(
+        f"{OLLAMA_URL}/api/generate",
         json={
-            "model": "mistral",  
+            "model": CHAT_MODEL,
             "prompt": prompt,
             "stream": True
-        }
+        },
+        stream=True
     )
     response.raise_for_status()
-    return response.json()["response"]
-
-
-def get_starter_questions(status: str, country: str, state: str, language: str = "English"):
-    """
-    Generates the top 5 most frequently asked questions from a knowledge base,
-    respecting filters and language, and returns them as a JSON list.
-    """
-
-    context = ask_question(f"Give me top five questions for a user with {status} status living in country: {country} and state: {state}")
-    system_prompt = """
+    # The streamed body is NDJSON: one {"response": "<token>", "done": ...} object per line.
+    tokens = []
+    with response:
+        for line in response.iter_lines():
+            if line:
+                chunk = json.loads(line)
+                tokens.append(chunk.get("response", ""))
+                if chunk.get("done"):
+                    break
+    return "".join(tokens)
+
+
+def starter_retrieval_question(status: str, country: str, state: str):
+    return f"Give me top five questions for a user with {status} status living in country: {country} and state: {state}"
+
+STARTER_SYSTEM_PROMPT = textwrap.dedent("""
     [PERSONA]
     Your purpose is to generate top 5 relavent question for the user based on their profile. The user profile includes their current visa status , country and state of residence. Try do be diverse with the questions you generate.
     
@@ -181,7 +507,9 @@ def get_starter_questions(status: str, country: str, state: str, language: str =
     [EXAMPLE RESPONSE]
     What is an F1 visa?|How to apply for a Green Card?|What are the requirements for asylum?|How to renew a work permit?|What are the steps to citizenship?
 
-    """
+""").strip()
+
+def build_starter_messages(context, status: str, country: str, state: str, language: str = "English"):
 
     user_message = f"""
     Here is the information for the user's request. Please follow all rules in your system prompt, especially the HTML formatting rules.
@@ -207,24 +535,39 @@ def get_starter_questions(status: str, country: str, state: str, language: str =
     </LANGUAGE>
     """
 
+    return [
+        {"role": "system", "content": STARTER_SYSTEM_PROMPT},
+        {"role": "user", "content": user_message}
+    ]
+
+def get_starter_questions(status: str, country: str, state: str, language: str = "English", priority: str = "queries"):
+    """
+    Generates the top 5 most frequently asked questions from a knowledge base,
+    respecting filters and language, and returns them as a JSON list.
+    `priority` is the generation class ("queries", or "warmup" for background refreshes).
+    """
+    context = ask_question(starter_retrieval_question(status, country, state))
+    with span("prompt"):
+        messages = build_starter_messages(context, status, country, state, language)
     try:
-        response = requests.post(
-            "http://localhost:11434/api/chat",
-            json={
-                "model": "mistral",
-                "stream": False,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ]
-            }
-        )
-        response.raise_for_status()
-        print(response.json()["message"]["content"])  # Debugging line
-        return response.json()["message"]["content"]
+        with span("llm"):
+            return ollama_client.chat(messages, priority=priority)
     except requests.exceptions.RequestException as e:
-        print(f"An API error occurred: {e}")
-        return "<p>Sorry, I am having trouble connecting to the service.</p>"
+        logger.warning("Ollama chat request failed: %s", e)
+        return SERVICE_ERROR_ANSWER
+
+async def aget_starter_questions(status: str, country: str, state: str, language: str = "English", priority: str = "queries"):
+    question = starter_retrieval_question(status, country, state)
+    embedding = await aollama_embed(question)
+    context = await asyncio.to_thread(ask_question, question, 3, embedding)
+    with span("prompt"):
+        messages = build_starter_messages(context, status, country, state, language)
+    try:
+        with span("llm"):
+            return await ollama_client.achat(messages, priority=priority)
+    except httpx.HTTPError as e:
+        logger.warning("Ollama chat request failed: %s", e)
+        return SERVICE_ERROR_ANSWER
 
 
 # 5. CLI
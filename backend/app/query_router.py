@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+from pathlib import Path
+import json
+import os
+import re
+import numpy as np
+from config import ROUTER_CENTROIDS_PATH, ROUTER_CENTROID_MARGIN, ROUTER_MAX_TOPICS, ROUTER_CATCHALL_TOPICS
+
+# Lightweight query router: predicts the topic(s) of a question so retrieval
+# can pass a `where` filter to Chroma instead of searching the whole
+# collection. Topics come from keyword rules first and, failing that, from the
+# nearest topic centroids computed at ingest. Only topics that the ingested
+# corpus actually contains are used; when nothing is left the route is empty
+# and retrieval stays unfiltered. There is no language filter: most of the
+# corpus is English, so a Nepali question still needs the English chunks.
+
+# Mirrors the topics assigned by extract.guess_topic_from_path. Green cards and
+# asylum have no folder of their own; their documents are tagged "immigration".
+TOPIC_KEYWORDS = {
+    "banking": ["bank", "banking", "account", "checking", "savings", "credit card", "debit", "routing number", "zelle"],
+    "housing": ["housing", "rent", "lease", "apartment", "landlord", "tenant", "roommate", "sublease", "dorm"],
+    "immigration": ["visa", "f1", "f-1", "opt", "cpt", "stem", "i-20", "i-765", "sevis", "ead", "uscis", "h1b", "h-1b", "work permit", "practical training",
+                    "green card", "permanent resident", "i-485", "i-140", "adjustment of status", "perm", "labor certification",
+                    "asylum", "refugee", "persecution", "i-589"],
+    "taxation": ["tax", "taxes", "irs", "w-2", "1040", "1040nr", "itin", "social security tax", "medicare", "fica", "refund"],
+    "driving": ["driver", "driving", "license", "dmv", "car", "vehicle"],
+    "health": ["health", "medical", "insurance", "doctor", "hospital", "vaccination", "vaccine", "i-693", "clinic"],
+    "nepali_info": ["nepal", "nepali", "consulate", "embassy", "passport renewal", "consular"],
+    "student_life": ["student", "university", "campus", "class", "semester", "scholarship"],
+}
+
+_KEYWORD_PATTERNS = {
+    topic: re.compile(r"(?<![\w-])(" + "|".join(re.escape(k) for k in keywords) + r")(?![\w-])")
+    for topic, keywords in TOPIC_KEYWORDS.items()
+}
+
+
+@dataclass
+class Route:
+    topics: list = None
+    source: str = "none"
+
+    def where(self):
+        """Chroma `where` filter for this route, or None for an unfiltered search."""
+        if not self.topics:
+            return None
+        return {"topic": {"$in": self.topics + [t for t in ROUTER_CATCHALL_TOPICS if t not in self.topics]}}
+
+    def accepts(self, metadata):
+        """Same filter as where(), as a predicate over chunk metadata (used for BM25)."""
+        return not self.topics or metadata.get("topic") in self.topics or metadata.get("topic") in ROUTER_CATCHALL_TOPICS
+
+
+# 1. Topic centroids, written by ingest.py
+def compute_topic_stats(embeddings, metadatas):
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    topics = np.array([meta.get("topic", "general") for meta in metadatas])
+    centroids = {}
+    for topic in sorted(set(topics)):
+        centroid = vectors[topics == topic].mean(axis=0)
+        centroids[str(topic)] = (centroid / max(np.linalg.norm(centroid), 1e-12)).tolist()
+    languages = {}
+    for meta in metadatas:
+        languages[meta.get("language", "unknown")] = languages.get(meta.get("language", "unknown"), 0) + 1
+    return {"centroids": centroids, "languages": languages}
+
+def save_topic_stats(stats, path=ROUTER_CENTROIDS_PATH):
+    path = Path(path)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(stats, f)
+    os.replace(tmp_path, path)
+
+
+# 2. Router
+class QueryRouter:
+    def __init__(self, path=ROUTER_CENTROIDS_PATH):
+        self.path = path
+        self._mtime = None
+        self.topics = []
+        self.centroids = None
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        with open(self.path, "r") as f:
+            stats = json.load(f)
+        self.topics = list(stats["centroids"])
+        self.centroids = np.asarray([stats["centroids"][t] for t in self.topics], dtype=np.float32) if self.topics else None
+        self._mtime = mtime
+
+    def keyword_topics(self, question):
+        text = question.lower()
+        scores = {topic: len(pattern.findall(text)) for topic, pattern in _KEYWORD_PATTERNS.items()}
+        best = max(scores.values())
+        if best == 0:
+            return None
+        # Only topics the corpus contains; an unknown topic would filter out every chunk.
+        topics = [topic for topic, score in scores.items() if score == best and topic in self.topics]
+        return topics if topics and len(topics) <= ROUTER_MAX_TOPICS else None
+
+    def centroid_topics(self, embedding):
+        if self.centroids is None or len(self.topics) < 2:
+            return None
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= max(np.linalg.norm(query), 1e-12)
+        scores = self.centroids @ query
+        order = np.argsort(-scores)
+        topics = [self.topics[i] for i in order if scores[i] >= scores[order[0]] - ROUTER_CENTROID_MARGIN]
+        if len(topics) > ROUTER_MAX_TOPICS or set(topics) <= set(ROUTER_CATCHALL_TOPICS):
+            return None
+        return topics
+
+    def route(self, question, embedding=None):
+        self._reload()
+        topics = self.keyword_topics(question)
+        source = "keywords"
+        if topics is None and embedding is not None:
+            topics = self.centroid_topics(embedding)
+            source = "centroids"
+        if topics is None:
+            source = "none"
+        return Route(topics=topics, source=source)
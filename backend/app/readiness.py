@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+import ollama_client
+import starter_questions
+from query import get_vector_engine, get_lexical_index, embedder
+from services import event_recommender, faq_store
+from config import (
+    OLLAMA_URL, OLLAMA_CHAT_URLS, CHAT_MODEL, RETRIEVAL_ENGINE, RECOMMENDER_MODE, STARTER_WARMUP_ENABLED,
+    STARTUP_WARMUP_ENABLED, STARTUP_WARMUP_CHAT, STARTUP_WARMUP_RETRY
+)
+
+# Startup warm-up and health reporting for /healthz and /readyz.
+#
+# Nothing expensive happens at import: the vector index, HTTP clients and
+# models are all opened on first use. The warm-up thread makes that first use
+# happen before traffic arrives. It opens the index, embeds a dummy text and
+# generates one token on every chat endpoint (so Ollama loads both models).
+# Failed checks are retried every STARTUP_WARMUP_RETRY seconds, and /readyz
+# answers 503 until all of them have passed, so a rolling restart only routes
+# traffic to warm processes. Once they pass, the recommender vectors, FAQ
+# bodies and starter question cache are pre-filled on a best-effort basis.
+#
+# /healthz is a liveness check: it is 200 while the process runs and reports
+# each dependency separately (last warm-up result plus a live Ollama probe).
+
+logger = logging.getLogger(__name__)
+
+_started_at = time.time()
+_status = {}  # dependency -> {"ok", "detail", "latency_ms", "checked_at"}
+_status_lock = threading.Lock()
+_ready = threading.Event()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def _run(name, check):
+    start = time.perf_counter()
+    try:
+        detail, ok = check(), True
+    except Exception as e:
+        detail, ok = f"{type(e).__name__}: {e}", False
+    with _status_lock:
+        _status[name] = {
+            "ok": ok,
+            "detail": detail,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "checked_at": time.time(),
+        }
+    if not ok:
+        logger.warning("Warm-up check %s failed: %s", name, detail)
+    return ok
+
+
+# 1. Checks
+def check_vector_index():
+    count = len(get_vector_engine())
+    if count == 0:
+        raise RuntimeError("the index is empty; run ingest.py")
+    return f"{RETRIEVAL_ENGINE}: {count} chunks"
+
+def check_lexical_index():
+    return f"{len(get_lexical_index())} chunks"
+
+def check_embed():
+    vectors = embedder.embed(["warm-up"])
+    return f"{embedder.name}:{embedder.model}, dim {len(vectors[0])}"
+
+def check_chat():
+    # Lowest priority and a single token: loads the model without delaying real
+    # chats. Idle endpoints are picked in rotation, so each one gets a call.
+    for _ in OLLAMA_CHAT_URLS:
+        ollama_client.chat([{"role": "user", "content": "Hi"}], priority="warmup", options={"num_predict": 1})
+    return f"{CHAT_MODEL} on {len(OLLAMA_CHAT_URLS)} endpoint(s)"
+
+def prefill_caches():
+    filled = []
+    if RECOMMENDER_MODE == "embedding":
+        event_recommender.refresh()
+        filled.append("recommendations")
+    faq_store.response("F1")
+    filled.append("faqs")
+    if STARTER_WARMUP_ENABLED:
+        scheduled = starter_questions.warm_up()
+        filled.append(f"starter questions ({scheduled} profiles refreshing)")
+    return ", ".join(filled)
+
+def warmup_checks():
+    """The checks /readyz waits for."""
+    checks = [
+        ("vector_index", check_vector_index),
+        ("lexical_index", check_lexical_index),
+        ("embed", check_embed),
+    ]
+    if STARTUP_WARMUP_CHAT:
+        checks.append(("chat", check_chat))
+    return checks
+
+
+# 2. Warm-up
+def warm_up():
+    """Runs every check that has not passed yet; returns True once all have."""
+    for name, check in warmup_checks():
+        with _status_lock:
+            passed = _status.get(name, {}).get("ok")
+        if not passed:
+            _run(name, check)
+    with _status_lock:
+        ready = all(_status.get(name, {}).get("ok") for name, _ in warmup_checks())
+    if ready and not _ready.is_set():
+        _run("caches", prefill_caches)
+        logger.info("Warm-up complete after %.1fs", time.time() - _started_at)
+        _ready.set()
+    return ready
+
+def _warmup_loop():
+    while not warm_up():
+        time.sleep(STARTUP_WARMUP_RETRY)
+
+def start():
+    """Starts the warm-up thread once per process; without warm-up the process is ready at once."""
+    global _thread
+    if not STARTUP_WARMUP_ENABLED:
+        _ready.set()
+        return
+    if _thread is not None:
+        return
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_warmup_loop, name="startup-warmup", daemon=True)
+            _thread.start()
+
+
+# 3. Reports
+def _ollama_probe():
+    start = time.perf_counter()
+    try:
+        loaded = ollama_client.running_models()
+        status = {"ok": True, "detail": f"loaded: {', '.join(loaded) or 'none'}"}
+    except Exception as e:
+        status = {"ok": False, "detail": f"{type(e).__name__}: {e}"}
+    status["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return status
+
+def health():
+    with _status_lock:
+        dependencies = {name: dict(status) for name, status in _status.items()}
+    dependencies["ollama"] = {"url": OLLAMA_URL, **_ollama_probe()}
+    return {
+        "status": "ok" if all(d["ok"] for d in dependencies.values()) else "degraded",
+        "ready": _ready.is_set(),
+        "uptime_s": round(time.time() - _started_at, 1),
+        "dependencies": dependencies,
+    }
+
+def readiness():
+    """(ready, body) for /readyz."""
+    with _status_lock:
+        dependencies = {name: dict(status) for name, status in _status.items()}
+    pending = [name for name, _ in warmup_checks() if not dependencies.get(name, {}).get("ok")] if STARTUP_WARMUP_ENABLED else []
+    ready = _ready.is_set()
+    return ready, {"ready": ready, "pending": pending, "dependencies": dependencies}
@@ -0,0 +1,169 @@
+from collections import namedtuple
+from pathlib import Path
+import hashlib
+import logging
+import os
+import threading
+import time
+import numpy as np
+from config import (
+    RECOMMENDER_CACHE_PATH, RECOMMENDER_EMBED_BATCH_SIZE,
+    RECOMMENDER_RECENCY_WEIGHT, RECOMMENDER_RECENCY_DAYS, RECOMMENDER_LOCATION_WEIGHT
+)
+from event_store import normalize_state
+
+# Embedding-based event ranking. Each event's name, description and tags are
+# embedded once; vectors are cached on disk by content hash so only new or
+# edited events are re-embedded. All vectors live in one contiguous, normalized
+# float32 matrix, so ranking every event for a user is a single matrix-vector
+# product plus vectorized recency and location boosts.
+#
+# When events.json changes, requests keep using the previous index (or the
+# keyword ranking, before the first build) while a background thread embeds the
+# new events, so no request waits for the catalog to be embedded.
+
+logger = logging.getLogger(__name__)
+
+REBUILD_RETRY_SECONDS = 30  # after a failed background build
+
+
+def event_text(event):
+    return f"{event['name']}. {event['description']} Tags: {', '.join(event.get('tags', []))}"
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def profile_text(interests, status):
+    parts = []
+    if interests:
+        parts.append("Interested in " + ", ".join(interests))
+    if status:
+        parts.append(f"Visa status: {status}")
+    return ". ".join(parts)
+
+
+_Index = namedtuple("_Index", "snap matrix start states state_codes virtual")
+
+
+class EventRecommender:
+    def __init__(self, store, embed, cache_path=RECOMMENDER_CACHE_PATH, model="", catalog_embed=None):
+        self.store = store
+        self.embed = embed  # list[str] -> list[list[float]], for user profiles
+        # Event texts are embedded once and kept in this class's own vector cache,
+        # so they can skip the query-embedding cache behind `embed`.
+        self.catalog_embed = catalog_embed or embed
+        self.model = model  # part of the cache key, so switching models re-embeds the catalog
+        self.cache_path = Path(cache_path)
+        # (store snapshot, arrays built from it), published as one tuple so a
+        # request that overlaps a refresh never mixes old and new catalogs.
+        self._index = None
+        self._build_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._building = False
+        self._failed_at = None
+
+    def _load_cache(self):
+        if not self.cache_path.exists():
+            return {}
+        with np.load(self.cache_path) as data:
+            return dict(zip(data["hashes"].tolist(), data["vectors"]))
+
+    def _save_cache(self, hashes, matrix):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp.npz")
+        np.savez(tmp_path, hashes=np.array(hashes), vectors=matrix)
+        os.replace(tmp_path, self.cache_path)
+
+    def _build(self, snap):
+        hashes = [content_hash(f"{self.model}\n{event_text(event)}") for event in snap.raw]
+        cached = self._load_cache()
+        missing = [i for i, h in enumerate(hashes) if h not in cached]
+        for start in range(0, len(missing), RECOMMENDER_EMBED_BATCH_SIZE):
+            batch = missing[start:start + RECOMMENDER_EMBED_BATCH_SIZE]
+            for i, vector in zip(batch, self.catalog_embed([event_text(snap.raw[i]) for i in batch])):
+                cached[hashes[i]] = np.asarray(vector, dtype=np.float32)
+
+        if hashes:
+            matrix = np.ascontiguousarray(np.stack([cached[h] for h in hashes]), dtype=np.float32)
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        if missing or len(cached) != len(set(hashes)):
+            # Persist only vectors for the current catalog so stale entries are dropped.
+            self._save_cache(hashes, matrix)
+
+        states = [normalize_state(event['location']['state']) for event in snap.raw]
+        state_codes = {state: code for code, state in enumerate(sorted(set(states)))}
+        return _Index(
+            snap=snap,
+            matrix=matrix,
+            start=np.asarray(snap.start, dtype=np.float64),
+            states=np.array([state_codes[state] for state in states], dtype=np.int32),
+            state_codes=state_codes,
+            virtual=np.array([bool(event['location'].get('is_virtual')) for event in snap.raw]),
+        )
+
+    def refresh(self, wait=True):
+        """
+        Makes sure the index matches the store's current snapshot and returns it.
+        With wait=False a stale index is rebuilt in a background thread and the
+        previous index (None before the first build) is returned meanwhile.
+        """
+        snap = self.store.snapshot()
+        index = self._index
+        if index is not None and index.snap is snap:
+            return index
+        if not wait:
+            with self._lock:
+                retry = self._failed_at is None or time.monotonic() - self._failed_at >= REBUILD_RETRY_SECONDS
+                if not self._building and retry:
+                    self._building = True
+                    threading.Thread(target=self._background_refresh, name="event-embeddings", daemon=True).start()
+            return index
+        with self._build_lock:
+            index = self._index
+            if index is None or index.snap is not snap:
+                index = self._index = self._build(snap)
+        return index
+
+    def _background_refresh(self):
+        failed_at = None
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning("Event embedding refresh failed, keeping the previous ranking: %s", e)
+            failed_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._failed_at = failed_at
+                self._building = False
+
+    def recommend(self, interests=(), state=None, status=None, page=1, page_size=20, now=None):
+        """Returns (events, total) for the requested page, best match first."""
+        index = self.refresh(wait=False)
+        text = profile_text(interests, status)
+        if index is None or len(index.snap.events) == 0 or not text:
+            return self.store.recommend(interests, state, status, page, page_size, now)
+        snap = index.snap
+        total = len(snap.events)
+
+        user = np.asarray(self.embed([text])[0], dtype=np.float32)
+        user /= max(np.linalg.norm(user), 1e-12)
+        scores = index.matrix @ user
+
+        # Upcoming events get a boost that decays with time to start; past ones a flat penalty.
+        now = now if now is not None else time.time()
+        until = (index.start - now) / 86400.0
+        upcoming = until >= 0
+        scores += np.where(upcoming, RECOMMENDER_RECENCY_WEIGHT * np.exp(-np.where(upcoming, until, 0) / RECOMMENDER_RECENCY_DAYS), -RECOMMENDER_RECENCY_WEIGHT)
+        if state:
+            scores += RECOMMENDER_LOCATION_WEIGHT * (index.states == index.state_codes.get(normalize_state(state), -1))
+            scores += 0.5 * RECOMMENDER_LOCATION_WEIGHT * index.virtual
+
+        page = max(1, page)
+        top = min(page * page_size, total)
+        if top <= (page - 1) * page_size:
+            return [], total
+        candidates = np.argpartition(-scores, top - 1)[:top] if top < total else np.arange(total)
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [snap.events[i] for i in ranked[(page - 1) * page_size:top]], total
@@ -1,18 +1,21 @@
 from functools import wraps
+import inspect
 from flask import request, jsonify
 from pydantic import ValidationError
+from metrics import span
 
 def parse_request(model_class):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             try:
-                json_data = request.get_json()
-                if json_data is None:
-                    return jsonify({"error": "No JSON data provided"}), 400
-                
-                # Validate with Pydantic
-                validated_data = model_class(**json_data)
+                with span("parse_request"):
+                    json_data = request.get_json()
+                    if json_data is None:
+                        return jsonify({"error": "No JSON data provided"}), 400
+
+                    # Validate with Pydantic
+                    validated_data = model_class(**json_data)
                 
                 # Call the original function with validated data
                 return f(validated_data, *args, **kwargs)
@@ -22,4 +25,41 @@ def parse_request(model_class):
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
         return decorated_function
-    return decorator
\ No newline at end of file
+    return decorator
+
+def parse_async_request(model_class):
+    """
+    Starlette counterpart of parse_request for the ASGI app: validates the JSON
+    body with the given Pydantic model and returns the same error payloads.
+    Handlers that declare a `request` parameter also receive the raw request.
+    """
+    from starlette.responses import JSONResponse
+
+    def decorator(f):
+        wants_request = "request" in inspect.signature(f).parameters
+
+        @wraps(f)
+        async def decorated_function(request, *args, **kwargs):
+            try:
+                with span("parse_request"):
+                    try:
+                        json_data = await request.json()
+                    except ValueError:
+                        json_data = None
+                    if json_data is None:
+                        return JSONResponse({"error": "No JSON data provided"}, status_code=400)
+
+                    # Validate with Pydantic
+                    validated_data = model_class(**json_data)
+
+                # Call the original function with validated data
+                if wants_request:
+                    kwargs["request"] = request
+                return await f(validated_data, *args, **kwargs)
+
+            except ValidationError as e:
+                return JSONResponse({"error": "Invalid request data", "details": e.errors(include_url=False)}, status_code=400)
+            except Exception as e:
+                return JSONResponse({"error": str(e)}, status_code=500)
+        return decorated_function
+    return decorator
@@ -0,0 +1,136 @@
+from collections import Counter
+import logging
+import math
+import threading
+import time
+from cache import TTLCache
+from lexical_index import tokenize
+
+# Second-stage reranking. Retrieval pulls a wide candidate pool (RERANK_CANDIDATES
+# hits) and the reranker rescores each (question, chunk) pair so only the best
+# few passages reach the prompt. Two scorers:
+#
+#   lexical        BM25 over the candidate pool plus a bonus for query term
+#                  pairs that appear next to each other in the chunk; no model,
+#                  well under a millisecond per candidate
+#   cross-encoder  a sentence-transformers CrossEncoder (e.g. MiniLM), loaded on
+#                  first use and scored in batches
+#
+# Cross-encoder scores are cached per (scorer, question, chunk id); chunk ids
+# contain the source's content hash, so a re-ingested file never reuses stale
+# scores. Lexical scores depend on the whole pool (IDF, average length) and are
+# cheap, so they are recomputed every time.
+# Scoring stops once the latency budget is spent: candidates that were not
+# scored keep their first-stage order behind the scored ones.
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(question):
+    return " ".join(question.lower().split())
+
+
+class LexicalScorer:
+    name = "lexical"
+    # IDF and length normalization come from the pool, so the pool is scored in
+    # one call and a score is only valid for the pool it was computed in.
+    batched = False
+    cacheable = False
+
+    def __init__(self, k1=1.2, b=0.75, pair_weight=0.5):
+        self.k1 = k1
+        self.b = b
+        self.pair_weight = pair_weight
+
+    def score(self, question, documents):
+        query_terms = list(dict.fromkeys(tokenize(question)))
+        if not query_terms or not documents:
+            return [0.0] * len(documents)
+        tokenized = [tokenize(document) for document in documents]
+        counts = [Counter(tokens) for tokens in tokenized]
+        average_length = sum(len(tokens) for tokens in tokenized) / len(tokenized) or 1.0
+        pool = len(documents)
+        idf = {t: math.log(1 + (pool - df + 0.5) / (df + 0.5))
+               for t in query_terms for df in [sum(1 for c in counts if t in c)]}
+        query_pairs = set(zip(query_terms, query_terms[1:]))
+
+        scores = []
+        for tokens, tf in zip(tokenized, counts):
+            norm = self.k1 * (1 - self.b + self.b * len(tokens) / average_length)
+            score = sum(idf[t] * tf[t] * (self.k1 + 1) / (tf[t] + norm) for t in query_terms if t in tf)
+            if query_pairs:
+                # Phrases such as "work permit" or "green card" matched in order.
+                score += self.pair_weight * len(query_pairs & set(zip(tokens, tokens[1:]))) / len(query_pairs)
+            scores.append(score)
+        return scores
+
+
+class CrossEncoderScorer:
+    batched = True
+    cacheable = True
+
+    def __init__(self, model, device="cpu", max_length=512):
+        self.name = f"cross-encoder:{model}"
+        self.model = model
+        self.device = device
+        self.max_length = max_length
+        self._model = None
+        self._lock = threading.Lock()
+
+    def score(self, question, documents):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+                self._model = CrossEncoder(self.model, device=self.device, max_length=self.max_length)
+                logger.info("Loaded reranker model %s", self.model)
+            scores = self._model.predict([(question, document) for document in documents],
+                                         batch_size=len(documents), show_progress_bar=False)
+        return [float(score) for score in scores]
+
+
+class Reranker:
+    def __init__(self, scorer, batch_size=16, budget_ms=150, cache_size=20000, cache_ttl=86400):
+        self.scorer = scorer
+        self.batch_size = max(1, batch_size)
+        self.budget = budget_ms / 1000
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.over_budget = 0
+
+    def rerank(self, question, hits, top_n):
+        """
+        hits: (id, document, metadata) candidates in first-stage order.
+        Returns the top_n hits by reranker score.
+        """
+        if len(hits) <= 1:
+            return hits[:top_n]
+        deadline = time.perf_counter() + self.budget
+        question_key = normalize(question)
+        scores = {}
+        missing = []
+        for rank, (doc_id, _, _) in enumerate(hits):
+            score = self.cache.get((self.scorer.name, question_key, doc_id)) if self.scorer.cacheable else None
+            if score is None:
+                missing.append(rank)
+            else:
+                scores[rank] = score
+
+        batch_size = self.batch_size if self.scorer.batched else max(1, len(missing))
+        for start in range(0, len(missing), batch_size):
+            if start and time.perf_counter() >= deadline:
+                self.over_budget += 1
+                logger.debug("Rerank budget spent after %d of %d candidates", start, len(missing))
+                break
+            batch = missing[start:start + batch_size]
+            try:
+                batch_scores = self.scorer.score(question, [hits[rank][1] for rank in batch])
+            except Exception as e:
+                logger.warning("Reranking failed, keeping first-stage order: %s", e)
+                break
+            for rank, score in zip(batch, batch_scores):
+                scores[rank] = score
+                if self.scorer.cacheable:
+                    self.cache.set((self.scorer.name, question_key, hits[rank][0]), score)
+
+        scored = sorted(scores, key=lambda rank: (-scores[rank], rank))
+        unscored = [rank for rank in range(len(hits)) if rank not in scores]
+        return [hits[rank] for rank in (scored + unscored)[:top_n]]
@@ -0,0 +1,204 @@
+from contextlib import asynccontextmanager, contextmanager
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+import metrics
+
+# Admission control for LLM generations. Each Ollama endpoint runs at most
+# `concurrency` generations per model at a time; further requests wait in one
+# priority queue (interactive chat ahead of starter questions, background
+# warm-ups last) and are given the least-loaded endpoint when a slot frees up.
+# A request that cannot start within its class's wait budget, or arrives when
+# the queue is full, fails fast with GenerationBusy so the caller can answer
+# from cache or say "busy" instead of piling onto an overloaded model.
+#
+# The scheduler is shared by the Flask threads and the ASGI event loop: sync
+# callers block on an Event, async callers await a future.
+
+
+class GenerationBusy(Exception):
+    """Raised when a generation cannot be admitted in time."""
+
+
+class _Waiter:
+    __slots__ = ("model", "priority", "deadline", "event", "future", "loop", "endpoint", "cancelled")
+
+    def __init__(self, model, priority, deadline, future=None, loop=None):
+        self.model = model
+        self.priority = priority
+        self.deadline = deadline
+        self.event = threading.Event() if future is None else None
+        self.future = future
+        self.loop = loop
+        self.endpoint = None
+        self.cancelled = False
+
+    def grant(self, endpoint):
+        self.endpoint = endpoint
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future, endpoint)
+
+    def reject(self):
+        self.cancelled = True
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future, None)
+
+def _resolve(future, endpoint):
+    if not future.done():
+        future.set_result(endpoint)
+
+
+class GenerationScheduler:
+    def __init__(self, endpoints, concurrency=2, max_queue=32, classes=None):
+        """
+        endpoints: Ollama base URLs. classes: {name: (priority, max_wait_seconds)},
+        lower priority values are served first.
+        """
+        self.endpoints = list(endpoints)
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self.classes = classes or {"default": (0, 30.0)}
+        self._in_flight = {}  # (endpoint, model) -> running generations
+        self._queue = []  # heap of (priority, seq, waiter)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._next_endpoint = itertools.count()
+        self.rejected = {}
+
+    def _class(self, name):
+        return self.classes.get(name) or self.classes.get("default") or (0, 30.0)
+
+    def _free_endpoint(self, model):
+        # Least-loaded endpoint with a free slot; ties rotate so load spreads evenly.
+        start = next(self._next_endpoint)
+        best = None
+        for i in range(len(self.endpoints)):
+            endpoint = self.endpoints[(start + i) % len(self.endpoints)]
+            load = self._in_flight.get((endpoint, model), 0)
+            if load < self.concurrency and (best is None or load < best[1]):
+                best = (endpoint, load)
+        return best[0] if best else None
+
+    def _take(self, endpoint, model):
+        self._in_flight[(endpoint, model)] = self._in_flight.get((endpoint, model), 0) + 1
+
+    def _busy(self, name, message):
+        self.rejected[name] = self.rejected.get(name, 0) + 1
+        return GenerationBusy(message)
+
+    def _admit(self, model, name, future=None, loop=None):
+        """Returns (endpoint, None) when a slot is free now, else (None, queued waiter)."""
+        priority, max_wait = self._class(name)
+        with self._lock:
+            if not any(w.model == model and not w.cancelled for _, _, w in self._queue):
+                endpoint = self._free_endpoint(model)
+                if endpoint is not None:
+                    self._take(endpoint, model)
+                    return endpoint, None
+            live = [entry for entry in self._queue if not entry[2].cancelled]
+            if len(live) >= self.max_queue:
+                # Full queue: shed the least important waiter if the newcomer outranks it.
+                worst = max(live, key=lambda entry: (entry[0], entry[1]))
+                if worst[0] <= priority:
+                    raise self._busy(name, f"generation queue is full ({len(live)} waiting)")
+                worst[2].reject()
+            waiter = _Waiter(model, priority, time.monotonic() + max_wait, future, loop)
+            heapq.heappush(self._queue, (priority, next(self._seq), waiter))
+            return None, waiter
+
+    def _release(self, endpoint, model):
+        with self._lock:
+            self._in_flight[(endpoint, model)] -= 1
+            self._dispatch()
+
+    def _dispatch(self):
+        # Called with the lock held: hand freed slots to the best queued waiters.
+        now = time.monotonic()
+        skipped = []
+        while self._queue:
+            priority, seq, waiter = heapq.heappop(self._queue)
+            if waiter.cancelled:
+                continue
+            if waiter.deadline <= now:
+                waiter.reject()
+                continue
+            endpoint = self._free_endpoint(waiter.model)
+            if endpoint is None:
+                skipped.append((priority, seq, waiter))
+                continue
+            self._take(endpoint, waiter.model)
+            waiter.grant(endpoint)
+        for entry in skipped:
+            heapq.heappush(self._queue, entry)
+
+    def _abandon(self, waiter):
+        """A waiter gave up (deadline or cancellation); returns a slot it may have been granted meanwhile."""
+        with self._lock:
+            waiter.cancelled = True
+            endpoint = waiter.endpoint
+        if endpoint is not None:
+            self._release(endpoint, waiter.model)
+
+    @contextmanager
+    def slot(self, model, name="default"):
+        """Blocks until a generation slot is free; yields the endpoint URL to use."""
+        endpoint, waiter = self._admit(model, name)
+        if waiter is not None:
+            waiter.event.wait(max(0.0, waiter.deadline - time.monotonic()))
+            if waiter.endpoint is None:
+                self._abandon(waiter)
+                raise self._busy(name, f"no generation slot within {self._class(name)[1]}s")
+            endpoint = waiter.endpoint
+        try:
+            yield endpoint
+        finally:
+            self._release(endpoint, model)
+
+    @asynccontextmanager
+    async def aslot(self, model, name="default"):
+        loop = asyncio.get_running_loop()
+        endpoint, waiter = self._admit(model, name, loop.create_future(), loop)
+        if waiter is not None:
+            try:
+                endpoint = await asyncio.wait_for(asyncio.shield(waiter.future), max(0.0, waiter.deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                self._abandon(waiter)
+                raise self._busy(name, f"no generation slot within {self._class(name)[1]}s")
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+            if endpoint is None:
+                self._abandon(waiter)
+                raise self._busy(name, "generation request was shed")
+        try:
+            yield endpoint
+        finally:
+            self._release(endpoint, model)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": dict(self._in_flight),
+                "queued": sum(1 for _, _, w in self._queue if not w.cancelled),
+                "rejected": dict(self.rejected),
+            }
+
+
+def register_metrics(scheduler):
+    def collect():
+        stats = scheduler.stats()
+        return [
+            ("machuni_generation_in_flight", "gauge", "Running LLM generations per endpoint and model.",
+             ("endpoint", "model"), {key: value for key, value in stats["in_flight"].items()}),
+            ("machuni_generation_queued", "gauge", "LLM generations waiting for a slot.",
+             (), {(): stats["queued"]}),
+            ("machuni_generation_rejected_total", "counter", "Generations refused as busy, by request class.",
+             ("class",), {(name,): count for name, count in stats["rejected"].items()}),
+        ]
+    metrics.register_collector(collect)
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+import itertools
+import threading
+import time
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Caches generated answers by question embedding. Entries are partitioned by a
+    filter key (e.g. status, language, country, state) so an answer is only
+    reused for users with the same profile, and a lookup hits when the cosine
+    similarity to a stored question reaches `threshold`. Entries expire after
+    `ttl` seconds and the least recently used ones are evicted past `maxsize`.
+    """
+
+    def __init__(self, threshold=0.95, maxsize=2000, ttl=3600):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._ids = itertools.count()
+        self._entries = OrderedDict()  # entry id -> (filter key, answer, expires at)
+        self._buckets = {}  # filter key -> {entry id: unit vector}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id):
+        filter_key, _, _ = self._entries.pop(entry_id)
+        bucket = self._buckets[filter_key]
+        del bucket[entry_id]
+        if not bucket:
+            del self._buckets[filter_key]
+
+    def lookup(self, embedding, filter_key, threshold=None):
+        threshold = self.threshold if threshold is None else threshold
+        query = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(filter_key)
+            if bucket:
+                for entry_id in [i for i in bucket if self._entries[i][2] <= now]:
+                    self._remove(entry_id)
+                bucket = self._buckets.get(filter_key)
+            if bucket:
+                ids = list(bucket)
+                scores = np.stack([bucket[i] for i in ids]) @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= threshold:
+                    self._entries.move_to_end(ids[best])
+                    self.hits += 1
+                    return self._entries[ids[best]][1]
+            self.misses += 1
+            return None
+
+    def store(self, embedding, filter_key, answer):
+        vector = self._normalize(embedding)
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (filter_key, answer, time.monotonic() + self.ttl)
+            self._buckets.setdefault(filter_key, {})[entry_id] = vector
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self):
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,45 @@
+from pathlib import Path
+import logging
+from custom_type import *
+from event_store import EventStore
+from faq_store import FaqStore
+from recommender import EventRecommender
+from query import embed_texts, embedder
+from config import RECOMMENDATIONS_MAX_PAGE_SIZE, RECOMMENDER_MODE
+
+# Request handling shared by the Flask app (app.py) and the ASGI app (asgi.py).
+# Nothing in here depends on the web framework.
+
+logger = logging.getLogger(__name__)
+
+data_path = Path(__file__).resolve().parent.parent / "data"
+
+
+def chat_filters(data: ChatRequest):
+    return {"status": data.status, "interests": data.interests, "country": data.country, "state": data.state}
+
+
+event_store = EventStore(data_path / "events.json")
+event_recommender = EventRecommender(event_store, embed_texts, model=embedder.model, catalog_embed=embedder.embed)
+
+def build_recommendations(data: RecommendationRequest):
+    page = max(1, data.page)
+    page_size = min(max(1, data.page_size), RECOMMENDATIONS_MAX_PAGE_SIZE)
+    args = (data.interests, data.state, data.status, page, page_size)
+    if RECOMMENDER_MODE == "embedding":
+        try:
+            events, total = event_recommender.recommend(*args)
+        except Exception as e:
+            # Embedding backend unavailable: fall back to keyword ranking.
+            logger.warning("Embedding recommender failed, using index ranking: %s", e)
+            events, total = event_store.recommend(*args)
+    else:
+        events, total = event_store.recommend(*args)
+    return RecommendationResponse(events, total, page, page_size)
+
+
+faq_store = FaqStore(data_path / "faqs.json", data_path / "faq_translations")
+
+def build_faqs(data: FaqRequest):
+    """Returns the pre-serialized FAQ JSON body and its ETag."""
+    return faq_store.response(data.status, data.language_preferance)
@@ -0,0 +1,165 @@
+from collections import Counter
+import asyncio
+import logging
+import re
+import threading
+from cache import StaleWhileRevalidateCache
+import metrics
+from query import get_starter_questions, aget_starter_questions, SERVICE_ERROR_ANSWER
+from scheduler import GenerationBusy
+from config import (
+    STARTER_CACHE_SIZE, STARTER_CACHE_TTL, STARTER_CACHE_STALE_TTL, STARTER_REFRESH_WORKERS,
+    STARTER_WARMUP_ENABLED, STARTER_WARMUP_INTERVAL, STARTER_WARMUP_STATUSES,
+    STARTER_WARMUP_LANGUAGES, STARTER_WARMUP_COUNTRY, STARTER_WARMUP_TOP
+)
+
+# Starter questions for /queries depend only on (status, country, state,
+# language), so generated lists are cached per profile with stale-while-
+# revalidate: once a profile has been generated, requests never wait on the
+# LLM again; stale entries are served while one background refresh replaces
+# them. A warm-up thread precomputes the default profiles and keeps the most
+# requested ones fresh. The model output is split into a list once, when the
+# cache is filled.
+#
+# Foreground generations run in the scheduler's "queries" class; background
+# refreshes and warm-ups use "warmup" so they never delay interactive chat. A
+# cold miss that cannot get a generation slot is answered with a generic list,
+# which is not cached.
+
+logger = logging.getLogger(__name__)
+
+starter_cache = StaleWhileRevalidateCache(STARTER_CACHE_SIZE, STARTER_CACHE_TTL, STARTER_CACHE_STALE_TTL, STARTER_REFRESH_WORKERS)
+metrics.register_cache("starter_questions", starter_cache)
+profile_counts = Counter()
+_profiles = {}
+_counts_lock = threading.Lock()
+_pending = {}
+
+FALLBACK_QUESTIONS = [
+    "What documents do I need to keep my visa status?",
+    "How do I renew my work permit?",
+    "How do I apply for a Green Card?",
+    "Where can I get free legal help?",
+    "How do I report a change of address?",
+]
+
+
+def split_queries(queries: str):
+    return re.split(r'\||\n', queries)
+
+def parse_starter_questions(text):
+    return [q.strip() for q in split_queries(text) if q.strip()]
+
+def profile_key(status, country, state, language):
+    return tuple((value or "").strip().lower() for value in (status, country, state, language or "English"))
+
+def _record(key, profile):
+    with _counts_lock:
+        # The profile space is small; the bound only guards against junk input.
+        if key in profile_counts or len(profile_counts) < STARTER_CACHE_SIZE:
+            profile_counts[key] += 1
+            _profiles.setdefault(key, profile)
+
+def _loader(status, country, state, language, priority="warmup"):
+    def load():
+        text = get_starter_questions(status, country, state, language, priority)
+        # Service errors are returned to the caller but never cached.
+        return None if text == SERVICE_ERROR_ANSWER else parse_starter_questions(text)
+    return load
+
+
+def starter_questions(status, country, state, language="English"):
+    key = profile_key(status, country, state, language)
+    _record(key, (status, country, state, language))
+    questions, fresh = starter_cache.get(key)
+    if questions is not None:
+        if not fresh:
+            starter_cache.stale_hits += 1
+            starter_cache.refresh(key, _loader(status, country, state, language))
+        return questions
+    try:
+        questions = starter_cache.get_or_load(key, _loader(status, country, state, language, "queries"))
+    except GenerationBusy:
+        return list(FALLBACK_QUESTIONS)
+    return questions if questions is not None else [SERVICE_ERROR_ANSWER]
+
+async def astarter_questions(status, country, state, language="English"):
+    key = profile_key(status, country, state, language)
+    _record(key, (status, country, state, language))
+    questions, fresh = starter_cache.get(key)
+    if questions is not None:
+        if not fresh:
+            starter_cache.stale_hits += 1
+            starter_cache.refresh(key, _loader(status, country, state, language))
+        return questions
+
+    # Cold miss: generate on the event loop instead of holding a worker thread on
+    # the LLM, sharing one generation between concurrent requests for the profile.
+    task = _pending.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_agenerate(key, status, country, state, language))
+        _pending[key] = task
+        task.add_done_callback(lambda _: _pending.pop(key, None))
+    try:
+        questions = await asyncio.shield(task)
+    except GenerationBusy:
+        return list(FALLBACK_QUESTIONS)
+    return questions if questions is not None else [SERVICE_ERROR_ANSWER]
+
+async def _agenerate(key, status, country, state, language):
+    text = await aget_starter_questions(status, country, state, language, "queries")
+    if text == SERVICE_ERROR_ANSWER:
+        return None
+    questions = parse_starter_questions(text)
+    starter_cache.set(key, questions)
+    return questions
+
+
+def warmup_profiles():
+    """Configured default profiles followed by the most requested ones."""
+    profiles = {
+        profile_key(status, STARTER_WARMUP_COUNTRY, "", language): (status, STARTER_WARMUP_COUNTRY, "", language)
+        for language in STARTER_WARMUP_LANGUAGES for status in STARTER_WARMUP_STATUSES
+    }
+    with _counts_lock:
+        for key, _ in profile_counts.most_common(STARTER_WARMUP_TOP):
+            profiles.setdefault(key, _profiles[key])
+    return profiles
+
+def warm_up():
+    """Schedules a background refresh for every warm-up profile that is missing or stale."""
+    scheduled = 0
+    for key, (status, country, state, language) in warmup_profiles().items():
+        _, fresh = starter_cache.get(key)
+        if not fresh:
+            starter_cache.refresh(key, _loader(status, country, state, language))
+            scheduled += 1
+    return scheduled
+
+def _warmup_loop(stop):
+    while True:
+        try:
+            scheduled = warm_up()
+            if scheduled:
+                logger.info("Starter questions: refreshing %d profiles", scheduled)
+        except Exception as e:
+            logger.warning("Starter question warm-up failed: %s", e)
+        if stop.wait(STARTER_WARMUP_INTERVAL):
+            return
+
+_warmup_stop = threading.Event()
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+
+def start_warmup():
+    """Starts the warm-up thread once per process (no-op when disabled)."""
+    global _warmup_thread
+    if not STARTER_WARMUP_ENABLED or _warmup_thread is not None:
+        return
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_warmup_loop, args=(_warmup_stop,), name="starter-warmup", daemon=True)
+            _warmup_thread.start()
+
+def stop_warmup():
+    _warmup_stop.set()
@@ -0,0 +1,57 @@
+from pathlib import Path
+import argparse
+import json
+import os
+from faq_store import faq_key, language_code
+
+# Offline batch job that translates faqs.json into data/faq_translations/<code>.json
+# so /faqs never translates per request. Only entries that are new or whose
+# English text changed since the last run are sent to the translator.
+#
+# Usage: python translate_faqs.py Nepali Hindi
+
+data_path = Path(__file__).resolve().parent.parent / "data"
+faqs_path = data_path / "faqs.json"
+translations_dir = data_path / "faq_translations"
+
+
+def translate_batch(texts, code):
+    from googletrans import Translator
+    translator = Translator()
+    return [result.text for result in translator.translate(texts, src="en", dest=code)]
+
+def translate_language(language, batch_size=50):
+    code = language_code(language)
+    out_path = translations_dir / f"{code}.json"
+    with open(faqs_path, "r") as f:
+        faqs = json.load(f)
+    existing = {}
+    if out_path.exists():
+        with open(out_path, "r") as f:
+            existing = json.load(f)
+
+    keys = [faq_key(faq) for faq in faqs]
+    todo = [(key, faq) for key, faq in zip(keys, faqs) if key not in existing]
+    for start in range(0, len(todo), batch_size):
+        batch = todo[start:start + batch_size]
+        texts = [text for _, faq in batch for text in (faq["question"], faq["answer"])]
+        translated = translate_batch(texts, code)
+        for i, (key, _) in enumerate(batch):
+            existing[key] = {"question": translated[2 * i], "answer": translated[2 * i + 1]}
+
+    # Drop translations of entries that no longer exist.
+    current = {key: existing[key] for key in keys if key in existing}
+    translations_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(current, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, out_path)
+    print(f"{language}: {len(todo)} translated, {len(current)} total -> {out_path.name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Translate FAQs offline for the /faqs endpoint.")
+    parser.add_argument("languages", nargs="*", default=["Nepali", "Hindi"])
+    args = parser.parse_args()
+    for language in args.languages:
+        translate_language(language)
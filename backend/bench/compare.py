@@ -0,0 +1,37 @@
+import argparse
+import json
+
+# Prints the change between two run_bench.py result files, e.g.
+#   python compare.py results/before.json results/after.json
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+
+def change(old, new):
+    if old in (None, 0) or new is None:
+        return ""
+    return f"{(new - old) / old * 100:+.1f}%"
+
+def compare(before, after):
+    print(f"{before['meta']['commit']} -> {after['meta']['commit']}")
+    for endpoint, levels in after["endpoints"].items():
+        for concurrency, stats in levels.items():
+            old = before["endpoints"].get(endpoint, {}).get(concurrency)
+            if old is None:
+                continue
+            cells = [f"{m} {old[m]} -> {stats[m]} ({change(old[m], stats[m])})" for m in METRICS]
+            print(f"/{endpoint} c={concurrency}: " + ", ".join(cells))
+    if before.get("ingest") and after.get("ingest"):
+        old, new = before["ingest"], after["ingest"]
+        print(f"ingest: {old['seconds']}s -> {new['seconds']}s ({change(old['seconds'], new['seconds'])})")
+    old, new = before.get("server_peak_rss_mb"), after.get("server_peak_rss_mb")
+    print(f"server peak RSS: {old} MB -> {new} MB ({change(old, new)})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+    with open(args.before) as f, open(args.after) as g:
+        compare(json.load(f), json.load(g))
@@ -0,0 +1,141 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import hashlib
+import json
+import math
+import re
+import time
+
+# Stand-in for the Ollama API used by the benchmarks (run_bench.py). It answers
+# /api/embed, /api/chat and /api/generate with deterministic output and a
+# tunable latency profile, so backend overhead can be measured without a GPU.
+#
+# Embeddings are feature-hashed bags of words: the same text always gets the
+# same unit vector and texts sharing words are close, so retrieval still
+# behaves sensibly. Chat replies stream a fixed answer one token at a time.
+#
+# Usage: python fake_ollama.py --port 11435 --ttft-ms 200 --token-ms 20
+
+ANSWER = (
+    "What documents do I need to renew my visa? | How do I apply for a work permit? | "
+    "Can I travel outside the US while my application is pending? | How do I open a bank account? | "
+    "Where can I find affordable health insurance?"
+)
+WORD = re.compile(r"\w+")
+
+
+def embed_text(text, dim):
+    vector = [0.0] * dim
+    for word in WORD.findall(text.lower()) or [""]:
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=16).digest()
+        for i in range(0, 16, 4):
+            index = int.from_bytes(digest[i:i + 3], "little") % dim
+            vector[index] += 1.0 if digest[i + 3] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+def reply_tokens(count):
+    words = ANSWER.split(" ")
+    return [words[i % len(words)] + " " for i in range(count)]
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    settings = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path in ("/api/tags", "/api/ps"):
+            self._send_json({"models": []})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        body = self._read_json()
+        if self.path == "/api/embed":
+            self.embed(body)
+        elif self.path in ("/api/chat", "/api/generate"):
+            self.generate(body, chat=self.path == "/api/chat")
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def embed(self, body):
+        texts = body.get("input", "")
+        texts = [texts] if isinstance(texts, str) else texts
+        s = self.settings
+        time.sleep((s.embed_ms + s.embed_item_ms * len(texts)) / 1000)
+        self._send_json({"model": body.get("model"), "embeddings": [embed_text(t, s.dim) for t in texts]})
+
+    def generate(self, body, chat):
+        s = self.settings
+        tokens = reply_tokens(s.tokens)
+
+        def chunk(token, done):
+            if chat:
+                return {"model": body.get("model"), "message": {"role": "assistant", "content": token}, "done": done}
+            return {"model": body.get("model"), "response": token, "done": done}
+
+        time.sleep(s.ttft_ms / 1000)
+        if not body.get("stream", True):
+            time.sleep(s.token_ms * len(tokens) / 1000)
+            self._send_json(chunk("".join(tokens), True))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(s.token_ms / 1000)
+                self._send_chunk(chunk(token, False))
+            self._send_chunk(chunk("", True))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away mid-stream, like a cancelled generation.
+            self.close_connection = True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Deterministic fake Ollama server for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--dim", type=int, default=768, help="embedding dimension")
+    parser.add_argument("--embed-ms", type=float, default=5.0, help="latency per /api/embed request")
+    parser.add_argument("--embed-item-ms", type=float, default=1.0, help="extra latency per embedded text")
+    parser.add_argument("--ttft-ms", type=float, default=200.0, help="time to first token")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="delay between streamed tokens")
+    parser.add_argument("--tokens", type=int, default=60, help="tokens per reply")
+    return parser.parse_args(argv)
+
+def serve(settings):
+    handler = type("Handler", (FakeOllamaHandler,), {"settings": settings})
+    server = ThreadingHTTPServer((settings.host, settings.port), handler)
+    server.daemon_threads = True
+    print(f"Fake Ollama listening on http://{settings.host}:{settings.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    serve(parse_args())
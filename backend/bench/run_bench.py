@@ -0,0 +1,265 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import requests
+
+# Benchmark harness for the backend. It starts the fake Ollama server
+# (fake_ollama.py), ingests data/PDFs into a scratch Chroma directory, starts
+# the Flask or ASGI app against that index and drives /chat, /queries,
+# /recommendations and /faqs at fixed concurrency levels. Latency percentiles,
+# throughput and peak RSS are written to a JSON file; compare two runs with
+# compare.py.
+#
+# Usage: python run_bench.py --server asgi --concurrency 1,8,32 --requests 200
+
+bench_dir = Path(__file__).resolve().parent
+app_dir = bench_dir.parent / "app"
+results_dir = bench_dir / "results"
+
+QUESTIONS = [
+    "What documents do I need to renew my F1 visa?",
+    "How do I apply for an EAD work permit?",
+    "Can I travel outside the US while my green card application is pending?",
+    "How do I open a bank account without an SSN?",
+    "Where can I find affordable health insurance as an international student?",
+    "What is the difference between OPT and CPT?",
+    "How do I change my address with USCIS?",
+    "What are my rights as a tenant?",
+]
+STATUSES = ["F1", "H1B", "J1", "PR", ""]
+STATES = ["California", "Texas", "New York", ""]
+INTERESTS = [["Job Search"], ["Cultural Events", "Arts"], ["Healthcare"], []]
+
+
+def payload(endpoint, i):
+    profile = {
+        "status": STATUSES[i % len(STATUSES)],
+        "interests": INTERESTS[i % len(INTERESTS)],
+        "country": "United States",
+        "state": STATES[i % len(STATES)],
+        "language_preferance": "English",
+    }
+    if endpoint == "chat":
+        # Suffix keeps questions distinct so the semantic cache does not short-circuit the run.
+        return {**profile, "question": f"{QUESTIONS[i % len(QUESTIONS)]} (case {i})"}
+    if endpoint == "faqs":
+        return {"status": profile["status"] or "F1", "language_preferance": "English"}
+    return profile
+
+
+# 1. Process helpers
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_until(check, timeout, what):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {what}")
+
+def peak_rss_mb(pid):
+    """High-water RSS of a running process (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=bench_dir, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+# 2. Benchmarks
+def bench_ingest(env):
+    start = time.perf_counter()
+    before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    subprocess.run([sys.executable, "ingest.py", "--full"], cwd=app_dir, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+    with open(Path(env["CHROMA_PATH"]) / "ingest_manifest.json") as f:
+        files = json.load(f)["files"]
+    chunks = sum(len(entry["chunk_ids"]) for entry in files.values())
+    pdf_bytes = sum(p.stat().st_size for p in (app_dir.parent / "data" / "PDFs").glob("**/*.pdf"))
+    return {
+        "seconds": round(elapsed, 3),
+        "files": len(files),
+        "chunks": chunks,
+        "chunks_per_sec": round(chunks / elapsed, 2),
+        "mb_per_sec": round(pdf_bytes / 1e6 / elapsed, 3),
+        # ru_maxrss is the largest child so far; only meaningful if ingest is the largest.
+        "peak_rss_mb": round(max(before, after) / 1024, 1) if after > before else None,
+    }
+
+def run_level(base_url, endpoint, concurrency, total, warmup):
+    url = f"{base_url}/{endpoint}"
+    local = threading.local()
+
+    def call(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.post(url, json=payload(endpoint, i), timeout=300)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(warmup)))
+        start = time.perf_counter()
+        results = list(pool.map(call, range(warmup, warmup + total)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(seconds * 1000 for seconds, ok in results if ok)
+    return {
+        "requests": total,
+        "errors": sum(1 for _, ok in results if not ok),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+    }
+
+
+# 3. Orchestration
+def server_command(server, port):
+    if server == "asgi":
+        return [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(port), "--log-level", "warning"]
+    return [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port), "--no-reload", "--no-debugger", "--with-threads"]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the backend against a fake Ollama server.")
+    parser.add_argument("--server", choices=["flask", "asgi"], default="flask")
+    parser.add_argument("--endpoints", default="chat,queries,recommendations,faqs")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint and level")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests before each level")
+    parser.add_argument("--skip-ingest", action="store_true", help="reuse --workdir from a previous run")
+    parser.add_argument("--workdir", help="scratch directory for Chroma, indexes and caches (default: temporary)")
+    parser.add_argument("--output", help="result file (default: results/<time>-<commit>.json)")
+    parser.add_argument("--answer-cache", action="store_true", help="leave the /chat semantic answer cache on")
+    parser.add_argument("--ttft-ms", type=float, default=200.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--embed-ms", type=float, default=5.0)
+    parser.add_argument("--embed-item-ms", type=float, default=1.0)
+    parser.add_argument("--dim", type=int, default=768)
+    return parser.parse_args(argv)
+
+def main(args):
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="machuni-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    ollama_port, app_port = free_port(), free_port()
+    env = {
+        **os.environ,
+        "OLLAMA_URL": f"http://127.0.0.1:{ollama_port}",
+        "CHROMA_PATH": str(workdir / "chromadb"),
+        "LEXICAL_INDEX_PATH": str(workdir / "bm25_index.json"),
+        "ROUTER_CENTROIDS_PATH": str(workdir / "topic_centroids.json"),
+        "RECOMMENDER_CACHE_PATH": str(workdir / "event_embeddings.npz"),
+        "EXACT_INDEX_PATH": str(workdir / "exact_index"),
+        "MULTILINGUAL_CACHE_PATH": str(workdir / "multilingual"),
+        "EMBED_CACHE_PATH": "",
+        "ANSWER_CACHE_ENABLED": "1" if args.answer_cache else "0",
+        "STARTER_WARMUP_ENABLED": "0",
+        "PYTHONUNBUFFERED": "1",
+    }
+    fake_args = ["--port", str(ollama_port), "--ttft-ms", str(args.ttft_ms), "--token-ms", str(args.token_ms),
+                 "--tokens", str(args.tokens), "--embed-ms", str(args.embed_ms),
+                 "--embed-item-ms", str(args.embed_item_ms), "--dim", str(args.dim)]
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "server": args.server,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "fake_ollama": {k: getattr(args, k) for k in ("ttft_ms", "token_ms", "tokens", "embed_ms", "embed_item_ms", "dim")},
+            "answer_cache": args.answer_cache,
+        },
+        "ingest": None,
+        "endpoints": {},
+    }
+
+    processes = []
+    try:
+        fake = subprocess.Popen([sys.executable, str(bench_dir / "fake_ollama.py"), *fake_args], stdout=subprocess.DEVNULL)
+        processes.append(fake)
+        wait_until(lambda: requests.get(f"{env['OLLAMA_URL']}/api/tags", timeout=1).ok, 10, "fake Ollama")
+
+        if not args.skip_ingest:
+            print("Benchmarking ingest ...", flush=True)
+            results["ingest"] = bench_ingest(env)
+            print(f"  {results['ingest']}", flush=True)
+
+        server = subprocess.Popen(server_command(args.server, app_port), cwd=app_dir, env=env, stdout=subprocess.DEVNULL)
+        processes.append(server)
+        base_url = f"http://127.0.0.1:{app_port}"
+        # /readyz turns 200 once the startup warm-up has loaded the index and both models.
+        wait_until(lambda: requests.get(f"{base_url}/readyz", timeout=1).ok, 120, "app server")
+
+        levels = [int(c) for c in args.concurrency.split(",")]
+        for endpoint in args.endpoints.split(","):
+            for concurrency in levels:
+                print(f"Benchmarking /{endpoint} at concurrency {concurrency} ...", flush=True)
+                stats = run_level(base_url, endpoint, concurrency, args.requests, args.warmup)
+                results["endpoints"].setdefault(endpoint, {})[str(concurrency)] = stats
+                print(f"  {stats}", flush=True)
+        results["server_peak_rss_mb"] = peak_rss_mb(server.pid)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = Path(args.output) if args.output else results_dir / f"{time.strftime('%Y%m%d-%H%M%S')}-{results['meta']['commit'] or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -11,6 +11,24 @@ import { useChatContext } from "../context/ChatContext";
 import PresetQuestions from "./PresetQuestions";
 import AvatarIdle from "./AvatarIdle";
 
+interface SSEEvent {
+  event: string;
+  data: { token?: string; answer?: string; error?: string };
+}
+
+const parseSSEEvent = (raw: string): SSEEvent => {
+  let event = "message";
+  const dataLines: string[] = [];
+  for (const line of raw.split("\n")) {
+    if (line.startsWith("event:")) {
+      event = line.slice(6).trim();
+    } else if (line.startsWith("data:")) {
+      dataLines.push(line.slice(5).trim());
+    }
+  }
+  return { event, data: dataLines.length ? JSON.parse(dataLines.join("\n")) : {} };
+};
+
 interface ChatTabProps {
   preferences: UserPreferences;
   onToggleSidebar: () => void;
@@ -30,6 +48,7 @@ const ChatTab: React.FC<ChatTabProps> = ({ preferences, onToggleSidebar }) => {
   const [error, setError] = useState<string | null>(null);
   const { addChatResponse } = useChatContext();
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const abortRef = useRef<AbortController | null>(null);
 
   const hasUserMessages = messages.some((m) => m.sender === "user");
 
@@ -37,6 +56,11 @@ const ChatTab: React.FC<ChatTabProps> = ({ preferences, onToggleSidebar }) => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [messages]);
 
+  // Cancel an in-flight answer when the tab unmounts so the backend stops generating.
+  useEffect(() => {
+    return () => abortRef.current?.abort();
+  }, []);
+
   const sendMessage = async (text: string) => {
     if (!text.trim()) return;
 
@@ -65,34 +89,80 @@ const ChatTab: React.FC<ChatTabProps> = ({ preferences, onToggleSidebar }) => {
         question: text.trim(),
       };
 
-      // Make API call to the chat endpoint
-      const response = await fetch("http://127.0.0.1:5000/chat", {
+      // Stream the answer from the chat endpoint (Server-Sent Events)
+      const controller = new AbortController();
+      abortRef.current = controller;
+      const response = await fetch("http://127.0.0.1:5000/chat/stream", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
         },
         body: JSON.stringify(chatRequest),
+        signal: controller.signal,
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const chatResponse: ChatResponse = await response.json();
+      const botId = (Date.now() + 1).toString();
+      let answer = "";
+
+      const appendToken = (token: string) => {
+        if (!answer) {
+          // First token: swap the typing indicator for the bot message.
+          setIsTyping(false);
+          setMessages((prev) => [
+            ...prev,
+            { id: botId, text: token, sender: "bot", timestamp: new Date() },
+          ]);
+        } else {
+          setMessages((prev) =>
+            prev.map((m) => (m.id === botId ? { ...m, text: m.text + token } : m))
+          );
+        }
+        answer += token;
+      };
 
-      // Store the response in chat history
-      addChatResponse(chatResponse);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let finished = false;
+
+      while (!finished) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary = buffer.indexOf("\n\n");
+        while (boundary !== -1) {
+          const event = parseSSEEvent(buffer.slice(0, boundary));
+          buffer = buffer.slice(boundary + 2);
+          boundary = buffer.indexOf("\n\n");
+
+          if (event.event === "token") {
+            appendToken(event.data.token ?? "");
+          } else if (event.event === "error") {
+            throw new Error(event.data.error);
+          } else if (event.event === "done") {
+            finished = true;
+            break;
+          }
+        }
+      }
 
-      // Add bot response to messages
-      const botResponse: Message = {
-        id: (Date.now() + 1).toString(),
-        text: chatResponse.answer,
-        sender: "bot",
-        timestamp: new Date(),
-      };
+      if (finished) {
+        reader.cancel();
+      }
+
+      const chatResponse: ChatResponse = { answer };
 
-      setMessages((prev) => [...prev, botResponse]);
+      // Store the response in chat history
+      addChatResponse(chatResponse);
     } catch (error) {
+      if (error instanceof DOMException && error.name === "AbortError") {
+        return;
+      }
       console.error("Error sending message:", error);
 
       const errorMessage =
@@ -109,6 +179,7 @@ const ChatTab: React.FC<ChatTabProps> = ({ preferences, onToggleSidebar }) => {
 
       setMessages((prev) => [...prev, errorResponse]);
     } finally {
+      abortRef.current = null;
       setIsTyping(false);
     }
   };
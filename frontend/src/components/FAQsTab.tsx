@@ -2,6 +2,9 @@ import React, { useState, useEffect } from "react";
 import { HelpCircle, Search, Filter, Menu } from "lucide-react";
 import { FAQItem, FAQRequest, FAQResponse, UserPreferences } from "../types";
 
+// Last FAQ response per (status, language) with its ETag, so unchanged FAQs come back as 304s.
+const faqCache = new Map<string, { etag: string; faqs: FAQItem[] }>();
+
 interface FAQsTabProps {
   preferences: UserPreferences;
   onToggleSidebar: () => void;
@@ -31,19 +34,31 @@ const FAQsTab: React.FC<FAQsTabProps> = ({ preferences, onToggleSidebar }) => {
         language_preferance: preferences.language_preference,
       };
 
+      const cacheKey = `${requestBody.status}|${requestBody.language_preferance}`;
+      const cached = faqCache.get(cacheKey);
       const response = await fetch("http://127.0.0.1:5000/faqs", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          ...(cached ? { "If-None-Match": cached.etag } : {}),
         },
         body: JSON.stringify(requestBody),
       });
 
+      if (response.status === 304 && cached) {
+        setFaqs(cached.faqs);
+        return;
+      }
+
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
       const data: FAQResponse = await response.json();
+      const etag = response.headers.get("ETag");
+      if (etag) {
+        faqCache.set(cacheKey, { etag, faqs: data.faqs || [] });
+      }
       setFaqs(data.faqs || []);
     } catch (error) {
       console.error("Error fetching FAQs:", error);